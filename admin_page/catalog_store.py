@@ -0,0 +1,180 @@
+import csv
+import os
+import sqlite3
+from data_access import (DATA_DIR, DPG_API_LIST_PATH, DPG_API_DETAIL_PATH, REASONS_PATH,
+                         DPG_ENCODING, REASONS_ENCODING, file_signature)
+
+# DPG API 카탈로그 SQLite 저장소
+# - apis: DPG_API_list.csv (orgId, title 인덱스, summary/description 전문 검색)
+# - api_fields: DPG_API_list_detail.csv (API별 세부속성, api_id/api_title 인덱스)
+# - api_reasons: AI 추천 사유 (api_title 기준으로 apis 와 조인)
+CATALOG_DB_PATH = os.path.join(DATA_DIR, 'dpg_catalog.sqlite3')
+
+API_COLUMNS = ['orgId', 'title', 'description', 'version', 'host', 'basePath', 'schemes', 'tags', 'summary']
+FIELD_COLUMNS = ['api_id', 'api_title', 'field_path', 'description', 'type', 'example']
+REASON_COLUMNS = {'api_title': 'api_title', '활용가능 속성 목록': 'usable_fields', '선택한 이유': 'reason'}
+
+# 테이블별 원본 CSV (테이블, 경로, 인코딩, {CSV 컬럼: 테이블 컬럼})
+SOURCES = (
+    ('apis', DPG_API_LIST_PATH, DPG_ENCODING, {name: name for name in API_COLUMNS}),
+    ('api_fields', DPG_API_DETAIL_PATH, DPG_ENCODING, {name: name for name in FIELD_COLUMNS}),
+    ('api_reasons', REASONS_PATH, REASONS_ENCODING, REASON_COLUMNS),
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS apis ({', '.join(f'"{name}" TEXT' for name in API_COLUMNS)});
+CREATE INDEX IF NOT EXISTS idx_apis_org_id ON apis (orgId);
+CREATE INDEX IF NOT EXISTS idx_apis_title ON apis (title);
+
+CREATE TABLE IF NOT EXISTS api_fields ({', '.join(f'"{name}" TEXT' for name in FIELD_COLUMNS)});
+CREATE INDEX IF NOT EXISTS idx_api_fields_api_id ON api_fields (api_id);
+CREATE INDEX IF NOT EXISTS idx_api_fields_api_title ON api_fields (api_title);
+
+CREATE TABLE IF NOT EXISTS api_reasons (api_title TEXT, usable_fields TEXT, reason TEXT);
+CREATE INDEX IF NOT EXISTS idx_api_reasons_api_title ON api_reasons (api_title);
+
+-- 마지막으로 가져온 원본 파일 (경로, 수정 시각, 크기)
+CREATE TABLE IF NOT EXISTS sources (name TEXT PRIMARY KEY, path TEXT, mtime_ns INTEGER, size INTEGER);
+"""
+
+# 한글은 띄어쓰기 단위 토큰으로는 부분 검색이 안 되므로 trigram 토크나이저 사용
+# (trigram 을 지원하지 않는 SQLite 에서는 unicode61)
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS apis_fts USING fts5(
+    title, summary, description, content='apis', content_rowid='rowid', tokenize='{tokenizer}'
+);
+"""
+
+# trigram 전문 검색이 가능한 최소 단어 길이 (더 짧은 단어는 LIKE 로 검색)
+FTS_MIN_LENGTH = 3
+
+def connect(db_path=CATALOG_DB_PATH):
+    """카탈로그 DB에 연결하고 스키마를 만듭니다."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    try:
+        conn.executescript(FTS_SCHEMA.format(tokenizer='trigram'))
+    except sqlite3.OperationalError:
+        conn.executescript(FTS_SCHEMA.format(tokenizer='unicode61'))
+    return conn
+
+def _read_rows(path, encoding, column_map):
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for row in csv.DictReader(f):
+            yield tuple(row.get(source) or None for source in column_map)
+
+def _is_current(conn, name, signature):
+    row = conn.execute("SELECT path, mtime_ns, size FROM sources WHERE name = ?", (name,)).fetchone()
+    return row is not None and tuple(row) == signature
+
+def import_csvs(conn, force=False):
+    """원본 CSV가 바뀐 테이블만 다시 가져옵니다. 다시 가져온 테이블 이름 목록을 반환합니다."""
+    imported = []
+    for name, path, encoding, column_map in SOURCES:
+        if not os.path.exists(path):
+            continue
+        signature = file_signature(path)
+        if not force and _is_current(conn, name, signature):
+            continue
+
+        columns = ', '.join(f'"{column}"' for column in column_map.values())
+        placeholders = ', '.join('?' for _ in column_map)
+        with conn:
+            conn.execute(f"DELETE FROM {name}")
+            conn.executemany(f"INSERT INTO {name} ({columns}) VALUES ({placeholders})",
+                             _read_rows(path, encoding, column_map))
+            if name == 'apis':
+                conn.execute("INSERT INTO apis_fts (apis_fts) VALUES ('rebuild')")
+            conn.execute("INSERT OR REPLACE INTO sources (name, path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                         (name,) + signature)
+        imported.append(name)
+    return imported
+
+def open_catalog(db_path=CATALOG_DB_PATH):
+    """카탈로그 DB를 열고 원본 CSV가 바뀌었으면 다시 가져옵니다."""
+    conn = connect(db_path)
+    import_csvs(conn)
+    return conn
+
+def _text_conditions(text):
+    """검색어의 모든 단어를 포함하는 조건과 파라미터를 만듭니다."""
+    conditions, params = [], []
+    long_words = [word for word in text.split() if len(word) >= FTS_MIN_LENGTH]
+    if long_words:
+        # 단어를 각각 구문으로 감싸서 FTS 문법 오류를 방지
+        conditions.append("a.rowid IN (SELECT rowid FROM apis_fts WHERE apis_fts MATCH ?)")
+        params.append(' '.join('"' + word.replace('"', '""') + '"' for word in long_words))
+    for word in text.split():
+        if len(word) < FTS_MIN_LENGTH:
+            conditions.append("(a.title LIKE ? OR a.summary LIKE ? OR a.description LIKE ?)")
+            params.extend([f"%{word}%"] * 3)
+    return conditions, params
+
+def _api_filters(text=None, org_id=None, title=None, recommended_only=False):
+    conditions, params = _text_conditions(text) if text else ([], [])
+    if org_id:
+        conditions.append("a.orgId = ?")
+        params.append(str(org_id))
+    if title:
+        conditions.append("a.title = ?")
+        params.append(title)
+    if recommended_only:
+        conditions.append("r.reason IS NOT NULL")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return where, params
+
+def count_apis(conn, text=None, org_id=None, title=None, recommended_only=False):
+    """조건에 맞는 API 수를 반환합니다."""
+    where, params = _api_filters(text, org_id, title, recommended_only)
+    query = f"SELECT COUNT(*) FROM apis a LEFT JOIN api_reasons r ON r.api_title = a.title {where}"
+    return conn.execute(query, params).fetchone()[0]
+
+def search_apis(conn, text=None, org_id=None, title=None, recommended_only=False,
+                limit=50, offset=0, truncate=None):
+    """조건에 맞는 API를 AI 추천 사유와 함께 추천 API 우선으로 반환합니다.
+
+    text 는 제목/요약/설명 전문 검색입니다. truncate 를 지정하면 summary/description 을
+    앞의 truncate 글자만 반환합니다. (전체 내용은 get_api 로 조회)
+    """
+    where, params = _api_filters(text, org_id, title, recommended_only)
+    if truncate:
+        text_columns = "substr(a.summary, 1, ?) AS summary, substr(a.description, 1, ?) AS description"
+        params = [truncate, truncate] + params
+    else:
+        text_columns = "a.summary, a.description"
+
+    query = f"""
+        SELECT a.rowid AS api_rowid, a.orgId, a.title, {text_columns}, r.usable_fields, r.reason
+        FROM apis a LEFT JOIN api_reasons r ON r.api_title = a.title
+        {where}
+        ORDER BY r.reason IS NULL, a.rowid
+        LIMIT ? OFFSET ?
+    """
+    return conn.execute(query, params + [limit, offset]).fetchall()
+
+def get_api(conn, api_rowid):
+    """API 한 건의 전체 내용을 반환합니다. 없으면 None."""
+    return conn.execute("""
+        SELECT a.rowid AS api_rowid, a.*, r.usable_fields, r.reason
+        FROM apis a LEFT JOIN api_reasons r ON r.api_title = a.title
+        WHERE a.rowid = ?
+    """, (api_rowid,)).fetchone()
+
+def api_fields(conn, api_id=None, api_title=None):
+    """API의 세부속성 목록을 반환합니다."""
+    if api_id is not None:
+        return conn.execute("SELECT * FROM api_fields WHERE api_id = ? ORDER BY rowid", (str(api_id),)).fetchall()
+    return conn.execute("SELECT * FROM api_fields WHERE api_title = ? ORDER BY rowid", (api_title,)).fetchall()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DPG API CSV를 SQLite 카탈로그로 가져오기')
+    parser.add_argument('--db-path', default=CATALOG_DB_PATH)
+    parser.add_argument('--force', action='store_true', help='바뀌지 않은 파일도 다시 가져오기')
+    args = parser.parse_args()
+
+    with connect(args.db_path) as conn:
+        imported = import_csvs(conn, force=args.force)
+    print(f"가져온 테이블: {', '.join(imported) or '없음 (변경 없음)'}")
@@ -0,0 +1,54 @@
+import json
+import os
+import pandas as pd
+import streamlit as st
+
+# 관리자 페이지에서 사용하는 데이터 파일 경로
+DATA_DIR = '/app/data'
+DPG_API_LIST_PATH = os.path.join(DATA_DIR, 'DPG_API_list.csv')
+DPG_API_DETAIL_PATH = os.path.join(DATA_DIR, 'DPG_API_list_detail.csv')
+REASONS_PATH = os.path.join(DATA_DIR, 'ml', 'Customized_Selection_Reasons_for_Social_Security_APIs.csv')
+RISK_DATA_PATH = os.path.join(DATA_DIR, 'Find_sigungu_with_sido_sigungu.csv')
+MODEL_INFO_PATH = os.path.join(DATA_DIR, 'ml', 'model_info.json')
+
+# 파일별 인코딩
+DPG_ENCODING = 'euc-kr'
+REASONS_ENCODING = 'utf-8'
+
+# 파일이 바뀔 때마다 새 항목이 생기므로 오래된 버전이 쌓이지 않도록 제한
+CACHE_MAX_ENTRIES = 16
+
+def file_signature(path):
+    """(경로, 수정 시각, 크기) 를 반환합니다. 파일이 바뀌면 캐시 키가 달라집니다."""
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _read_csv(signature, encoding):
+    return pd.read_csv(signature[0], encoding=encoding)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _read_json(signature):
+    with open(signature[0], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _sorted_risk_data(signature):
+    # 위험도 기준으로 정렬
+    return _read_csv(signature, DPG_ENCODING).sort_values('Result', ascending=False)
+
+def load_dpg_api_list():
+    """DPG API 목록 (DPG_API_list.csv)."""
+    return _read_csv(file_signature(DPG_API_LIST_PATH), DPG_ENCODING)
+
+def load_reasons():
+    """AI 추천 사유 (Customized_Selection_Reasons_for_Social_Security_APIs.csv)."""
+    return _read_csv(file_signature(REASONS_PATH), REASONS_ENCODING)
+
+def load_risk_data():
+    """시군구별 복지 위험도 (위험도 내림차순)."""
+    return _sorted_risk_data(file_signature(RISK_DATA_PATH))
+
+def load_model_info():
+    """머신러닝 모델 정보 (model_info.json)."""
+    return _read_json(file_signature(MODEL_INFO_PATH))
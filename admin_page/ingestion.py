@@ -0,0 +1,134 @@
+import datetime
+import fcntl
+import hashlib
+import io
+import json
+import math
+import os
+import pandas as pd
+from data_access import DATA_DIR, DPG_ENCODING
+
+# 파일별 중복 판단 키
+# (세부속성 파일은 API 하나에 속성 행이 여러 개이므로 속성 경로까지 키에 포함)
+DPG_API_LIST_KEYS = ['orgId', 'title']
+DPG_API_DETAIL_KEYS = ['api_id', 'api_title', 'field_path']
+
+# 처리한 업로드 파일 해시 기록 (한 줄에 하나씩 추가만 함)
+INGEST_LOG_PATH = os.path.join(DATA_DIR, 'ingested_uploads.jsonl')
+
+def _read_upload(data, file_name):
+    """업로드 파일을 DataFrame으로 읽습니다. (csv 는 euc-kr)
+
+    빈 칸이 있어도 숫자 컬럼이 float 로 바뀌지 않도록 모든 값을 문자열로 읽습니다.
+    """
+    if file_name.endswith('.csv'):
+        return pd.read_csv(io.BytesIO(data), encoding=DPG_ENCODING, dtype=str, keep_default_na=False)
+    if file_name.endswith('.json'):
+        return pd.read_json(io.BytesIO(data), dtype=False)
+    if file_name.endswith('.xlsx'):
+        return pd.read_excel(io.BytesIO(data), dtype=str, keep_default_na=False)
+    raise ValueError(f"지원하지 않는 파일 형식입니다: {file_name}")
+
+def _find_ingested(log_path, upload_hash, target_path):
+    """같은 대상 파일에 이미 반영된 업로드 기록을 반환합니다. 없으면 None."""
+    if not os.path.exists(log_path):
+        return None
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry['sha256'] == upload_hash and entry['target'] == target_path:
+                return entry
+    return None
+
+def _record_ingested(log_path, entry):
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+def _normalize_key(value):
+    """키 값을 비교용 문자열로 바꿉니다. 빈 값은 '', 3450.0 같은 정수형 실수는 '3450'."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _keys(df, key_columns):
+    """행별 키 튜플 목록을 반환합니다."""
+    columns = [df[column].map(_normalize_key) for column in key_columns]
+    return list(zip(*columns))
+
+def ingest_upload(data, file_name, target_path, key_columns, encoding=DPG_ENCODING, log_path=INGEST_LOG_PATH):
+    """업로드 파일에서 대상 CSV에 없는 행만 골라 파일 끝에 추가합니다.
+
+    같은 내용의 업로드(SHA-256 기준)는 한 번만 반영하므로, 업로더가 파일을 들고 있는
+    동안 Streamlit 이 다시 실행되어도 아무것도 쓰지 않습니다. 기존 파일은 키 컬럼만
+    읽고, 추가할 행은 잠금을 잡은 상태에서 한 번의 쓰기로 덧붙입니다. 반영 기록 확인과
+    기록도 같은 잠금 안에서 하므로 기록과 파일 내용이 어긋나지 않습니다.
+
+    {'file_name', 'target', 'appended', 'skipped', 'already_ingested'} 를 반환합니다.
+    """
+    upload_hash = hashlib.sha256(data).hexdigest()
+
+    with open(target_path, 'ab') as target:
+        # 여러 세션이 동시에 같은 파일에 추가하지 않도록 잠금
+        fcntl.flock(target, fcntl.LOCK_EX)
+        try:
+            entry = _find_ingested(log_path, upload_hash, target_path)
+            if entry is not None:
+                return dict(entry, already_ingested=True)
+
+            new_data = _read_upload(data, file_name)
+            missing_keys = [column for column in key_columns if column not in new_data.columns]
+            if missing_keys:
+                raise ValueError(f"업로드 파일에 키 컬럼이 없습니다: {', '.join(missing_keys)}")
+
+            # 업로드 파일 안의 중복 제거
+            upload_keys = _keys(new_data, key_columns)
+            unique = ~pd.Series(upload_keys, index=new_data.index).duplicated()
+            new_data = new_data[unique]
+            upload_keys = [key for key, keep in zip(upload_keys, unique) if keep]
+
+            target.seek(0, os.SEEK_END)
+            is_new_file = target.tell() == 0
+            if is_new_file:
+                columns = list(new_data.columns)
+                existing_keys = set()
+            else:
+                columns = list(pd.read_csv(target_path, encoding=encoding, nrows=0).columns)
+                existing = pd.read_csv(target_path, encoding=encoding, usecols=key_columns,
+                                       dtype=str, keep_default_na=False)
+                existing_keys = set(_keys(existing, key_columns))
+
+            new_rows = new_data[[key not in existing_keys for key in upload_keys]]
+
+            if len(new_rows):
+                # 기존 컬럼 순서에 맞추고, 인코딩 오류가 파일을 건드리기 전에 나도록 미리 변환
+                payload = new_rows.reindex(columns=columns).to_csv(index=False, header=is_new_file)
+                payload = payload.encode(encoding)
+                if not is_new_file and not _ends_with_newline(target_path):
+                    payload = b'\n' + payload
+                target.write(payload)
+                target.flush()
+                os.fsync(target.fileno())
+
+            entry = {
+                'sha256': upload_hash,
+                'file_name': file_name,
+                'target': target_path,
+                'appended': len(new_rows),
+                'skipped': len(new_data) - len(new_rows),
+                'ingested_at': datetime.datetime.now().isoformat(timespec='seconds')
+            }
+            _record_ingested(log_path, entry)
+            return dict(entry, already_ingested=False)
+        finally:
+            fcntl.flock(target, fcntl.LOCK_UN)
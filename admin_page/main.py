@@ -7,7 +7,13 @@ from fastapi.staticfiles import StaticFiles
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 import openai
 import os
-import json
+import math
+from contextlib import closing
+from data_access import (DPG_API_LIST_PATH, DPG_API_DETAIL_PATH, load_dpg_api_list, load_reasons,
+                         load_risk_data, load_model_info)
+from catalog_store import open_catalog, count_apis, search_apis, get_api, api_fields
+from ingestion import DPG_API_LIST_KEYS, DPG_API_DETAIL_KEYS, ingest_upload
+from region_analysis import RegionAnalysisService
 
 
 # Set page config for proper encoding (must be first Streamlit command)
@@ -309,6 +315,23 @@ with st.sidebar:
     ''',
                 unsafe_allow_html=True)
 
+def show_ingest_result(result):
+    """업로드 반영 결과를 표시합니다."""
+    target_name = os.path.basename(result['target'])
+    if result['already_ingested']:
+        st.write(f"파일 {result['file_name']}은(는) 이미 {target_name}에 반영되었습니다. (추가 {result['appended']}건)")
+    else:
+        st.write(f"파일 {result['file_name']}이(가) {target_name}에 추가되었습니다. "
+                 f"(추가 {result['appended']}건, 중복 제외 {result['skipped']}건)")
+
+# DPG API 목록 표: 페이지 크기 선택지와 요약/설명 표시 길이 (전체 내용은 행 선택 시 표시)
+GRID_PAGE_SIZES = (20, 50, 100)
+GRID_TEXT_LENGTH = 80
+
+def reset_api_page():
+    """검색/필터/페이지 크기가 바뀌면 첫 페이지부터 보여줍니다."""
+    st.session_state['api_page'] = 1
+
 # DPG API 목록 섹션
 st.markdown('<div id="dpg-api" style="padding-top: 2rem;"></div>', unsafe_allow_html=True)
 dpg_container = st.container()
@@ -320,45 +343,19 @@ with dpg_container:
     with col1:
         uploaded_file = st.file_uploader("파일을 선택하세요", type=['csv', 'json', 'xlsx'],key="file_api_list")
         if uploaded_file is not None:
-            if uploaded_file.name.endswith('.csv'):
-                new_data = pd.read_csv(uploaded_file,encoding='euc-kr')
-            elif uploaded_file.name.endswith('.json'):
-                new_data = pd.read_json(uploaded_file)
-            elif uploaded_file.name.endswith('.xlsx'):
-                new_data = pd.read_excel(uploaded_file)
-        
-        # 기존 DPG_API_list.csv 파일 읽기
-            dpg_api_data = pd.read_csv('/app/data/DPG_API_list.csv', encoding='euc-kr')
-            
-            # 데이터 병합
-            updated_data = pd.concat([dpg_api_data, new_data], ignore_index=True)
-            
-            # 병합된 데이터 저장
-            updated_data.to_csv('/app/data/DPG_API_list.csv', index=False, encoding='euc-kr')
-            
-            st.write(f"파일 {uploaded_file.name}이(가) DPG_API_list.csv에 추가되었습니다.")
+            try:
+                show_ingest_result(ingest_upload(uploaded_file.getvalue(), uploaded_file.name,
+                                                 DPG_API_LIST_PATH, DPG_API_LIST_KEYS))
+            except Exception as e:
+                st.error(f"파일을 반영하는 중 오류가 발생했습니다: {str(e)}")
     with col2:
         uploaded_file = st.file_uploader("세부속성 파일을 선택하세요", type=['csv', 'json', 'xlsx'], key="file_detail")
-       
         if uploaded_file is not None:
-            if uploaded_file.name.endswith('.csv'):
-                new_data = pd.read_csv(uploaded_file,encoding='euc-kr')
-            elif uploaded_file.name.endswith('.json'):
-                new_data = pd.read_json(uploaded_file)
-            elif uploaded_file.name.endswith('.xlsx'):
-                new_data = pd.read_excel(uploaded_file)
-
-                
-        # 기존 DPG_API_list.csv 파일 읽기
-            dpg_api_data = pd.read_csv('/app/data/DPG_API_list.csv', encoding='euc-kr')
-            
-            # 데이터 병합
-            updated_data = pd.concat([dpg_api_data, new_data], ignore_index=True)
-            
-            # 병합된 데이터 저장
-            updated_data.to_csv('/app/data/DPG_API_list.csv', index=False, encoding='euc-kr')
-            
-            st.write(f"파일 {uploaded_file.name}이(가) DPG_API_list_detail.csv에 추가되었습니다.")
+            try:
+                show_ingest_result(ingest_upload(uploaded_file.getvalue(), uploaded_file.name,
+                                                 DPG_API_DETAIL_PATH, DPG_API_DETAIL_KEYS))
+            except Exception as e:
+                st.error(f"파일을 반영하는 중 오류가 발생했습니다: {str(e)}")
     
     with col3:
         # AI 프롬프트 버튼
@@ -422,58 +419,82 @@ with dpg_container:
                 """)
 
     try:
-        # DPG API 목록 데이터 로드
-        dpg_api_data = pd.read_csv('/app/data/DPG_API_list.csv', encoding='euc-kr')
-        
-        # 선택 사유 데이터 로드
-        reasons_data = pd.read_csv('/app/data/ml/Customized_Selection_Reasons_for_Social_Security_APIs.csv', encoding='utf-8')
-        
-        # api_title 기준으로 데이터프레임 병합
-        merged_data = pd.merge(
-            dpg_api_data,
-            reasons_data[['api_title', '활용가능 속성 목록','선택한 이유']],
-            left_on='title',
-            right_on='api_title',
-            how='left'
-        )
-        
-        # AI 추천이 있는 행을 맨 위로 정렬
-        merged_data['has_reason'] = ~merged_data['선택한 이유'].isna()
-        merged_data = merged_data.sort_values('has_reason', ascending=False)
-        
-        # 정렬 후 순번 부여
-        merged_data = merged_data.reset_index(drop=True)  # drop=True로 이전 인스 제
-        merged_data['순번'] = merged_data.index + 1
-        
-        # Grid 옵션 설정
-        gb = GridOptionsBuilder.from_dataframe(merged_data[['순번', 'title', '선택한 이유','summary', 'description' ]])
-        
-        gb.configure_column('순번', header_name="No.", width=30)
-        gb.configure_column('선택한 이유', header_name="AI 추천 사유", width=200)
-        gb.configure_column('활용가능 속성 목록', header_name="AI추천 속성", width=200)
-        gb.configure_column('title', header_name="제목", width=50)
-        gb.configure_column('summary', header_name="요약", width=200)
-        gb.configure_column('description', header_name="설명", width=200)
-        
-        # 툴팁 커스터마이징 옵션 추가
-        gb.configure_grid_options(
-            tooltipShowDelay=0,
-            tooltipHideDelay=2000,
-            rowClassRules={
-                'recommended-row': 'data.선택한 이유 != null'
-            }
-        )
-        
-        grid_options = gb.build()
-        
-        # AgGrid 표시
-        AgGrid(
-            merged_data,
-            gridOptions=grid_options,
-            update_mode=GridUpdateMode.SELECTION_CHANGED,
-            allow_unsafe_jscode=True,
-            theme='streamlit'
-        )
+        # 검색/필터/페이지 설정 (조건에 맞는 현재 페이지 행만 카탈로그 DB에서 조회)
+        filter_cols = st.columns([3, 1, 1, 1])
+        with filter_cols[0]:
+            search_text = st.text_input("검색 (제목/요약/설명)", key="api_search", on_change=reset_api_page)
+        with filter_cols[1]:
+            recommended_only = st.checkbox("AI 추천만 보기", key="api_recommended_only", on_change=reset_api_page)
+        with filter_cols[2]:
+            page_size = st.selectbox("페이지 크기", GRID_PAGE_SIZES, key="api_page_size",
+                                     on_change=reset_api_page)
+
+        with closing(open_catalog()) as catalog:
+            total = count_apis(catalog, text=search_text, recommended_only=recommended_only)
+            page_count = max(1, math.ceil(total / page_size))
+            # 데이터가 바뀌어 페이지 수가 줄어든 경우 마지막 페이지로 이동
+            if st.session_state.get('api_page', 1) > page_count:
+                st.session_state['api_page'] = page_count
+            with filter_cols[3]:
+                page = st.number_input(f"페이지 (전체 {page_count})", min_value=1, max_value=page_count,
+                                       step=1, key="api_page")
+
+            # 긴 요약/설명은 잘라서 전송하고, 행을 선택하면 전체 내용을 표시
+            rows = search_apis(catalog, text=search_text, recommended_only=recommended_only,
+                               limit=page_size, offset=(page - 1) * page_size, truncate=GRID_TEXT_LENGTH)
+            page_data = pd.DataFrame([dict(row) for row in rows],
+                                     columns=['api_rowid', 'title', 'reason', 'summary', 'description'])
+            page_data = page_data.rename(columns={'reason': '선택한 이유'})
+            page_data.insert(0, '순번', range((page - 1) * page_size + 1, (page - 1) * page_size + len(page_data) + 1))
+
+            # Grid 옵션 설정
+            gb = GridOptionsBuilder.from_dataframe(page_data)
+
+            gb.configure_column('api_rowid', hide=True)
+            gb.configure_column('순번', header_name="No.", width=30)
+            gb.configure_column('선택한 이유', header_name="AI 추천 사유", width=200)
+            gb.configure_column('title', header_name="제목", width=50)
+            gb.configure_column('summary', header_name="요약", width=200)
+            gb.configure_column('description', header_name="설명", width=200)
+            gb.configure_selection('single')
+
+            # 툴팁 커스터마이징 옵션 추가
+            gb.configure_grid_options(
+                tooltipShowDelay=0,
+                tooltipHideDelay=2000,
+                rowClassRules={
+                    'recommended-row': 'data.선택한 이유 != null'
+                }
+            )
+
+            grid_options = gb.build()
+
+            # AgGrid 표시 (현재 페이지만 전송)
+            grid_response = AgGrid(
+                page_data,
+                gridOptions=grid_options,
+                update_mode=GridUpdateMode.SELECTION_CHANGED,
+                allow_unsafe_jscode=True,
+                theme='streamlit'
+            )
+            st.caption(f"전체 {total:,}건 중 {len(page_data):,}건 표시")
+
+            # 선택한 API의 전체 내용과 세부속성
+            selected_rows = grid_response['selected_rows']
+            if selected_rows is not None and len(selected_rows) > 0:
+                selected = selected_rows.iloc[0] if hasattr(selected_rows, 'iloc') else selected_rows[0]
+                api = get_api(catalog, int(selected['api_rowid']))
+                if api is not None:
+                    with st.expander(f"{api['title']} 상세 정보", expanded=True):
+                        if api['reason']:
+                            st.markdown(f"**AI 추천 사유**: {api['reason']}")
+                            st.markdown(f"**AI 추천 속성**: {api['usable_fields']}")
+                        st.markdown(f"**요약**: {api['summary'] or ''}")
+                        st.markdown(f"**설명**: {api['description'] or ''}")
+                        fields = api_fields(catalog, api_title=api['title'])
+                        if fields:
+                            st.dataframe(pd.DataFrame([dict(field) for field in fields]),
+                                         use_container_width=True, hide_index=True)
     except Exception as e:
         st.error(f"DPG API 목록을 불러오는 중 오류가 발생했습니다: {str(e)}")
 
@@ -486,9 +507,9 @@ with col1:
     st.markdown('<div class="section-header">데이터 현황</div>', unsafe_allow_html=True)
     
     try:
-        # CSV 파일에서 데이터 로드
-        reasons_data = pd.read_csv('/app/data/ml/Customized_Selection_Reasons_for_Social_Security_APIs.csv', encoding='utf-8')
-        dpg_api_data = pd.read_csv('/app/data/DPG_API_list.csv', encoding='euc-kr')
+        # CSV 파일에서 데이터 로드 (파일이 바뀌지 않았으면 캐시 사용)
+        reasons_data = load_reasons()
+        dpg_api_data = load_dpg_api_list()
         
         # 통계 계산
         total_apis = len(dpg_api_data)  # 전체 API 수
@@ -527,15 +548,56 @@ with col2:
 
 # OpenAI Assistant ID 설정
 ASSISTANT_ID = 'asst_HO7yQOK6MEU1lm7PyJ7Kv1TO'
-client = openai.OpenAI()
+# 분석 진행 상황 확인 주기 (초)
+REGION_ANALYSIS_REFRESH_SECONDS = 1
 
-try:
+@st.cache_resource
+def get_region_analysis_service():
+    """Assistant 를 확인하고 지역 분석 서비스를 만듭니다. (모든 세션이 결과 캐시를 공유)"""
+    client = openai.OpenAI()
     assistant = client.beta.assistants.retrieve(ASSISTANT_ID)
     print('Assistant retrieved:', assistant.id)
+    return RegionAnalysisService(client, ASSISTANT_ID)
+
+try:
+    region_analysis = get_region_analysis_service()
 except Exception as e:
     st.error(f"Assistant 초기화 실패: {str(e)}")
     st.stop()
 
+@st.fragment(run_every=REGION_ANALYSIS_REFRESH_SECONDS)
+def wait_for_region_analysis(region_data, future):
+    """분석이 끝날 때까지 이 영역만 주기적으로 다시 그리고, 끝나면 결과를 표시하도록 앱을 다시 실행합니다."""
+    if future.done():
+        st.rerun()
+    st.info(f"AI가 {region_data['Sido']} {region_data['Sigungu']} 지역을 분석 중입니다...")
+
+def show_region_analysis():
+    """선택한 지역의 분석 결과를 표시합니다.
+
+    분석 중일 때만 주기적으로 갱신되는 fragment 를 그리므로, 결과가 표시된 뒤에는 다시 실행되지 않습니다.
+    """
+    selected = st.session_state.get('region_analysis')
+    if selected is None:
+        return
+    region_data, future = selected
+    if not future.done():
+        wait_for_region_analysis(region_data, future)
+        return
+
+    result = future.result()
+    if result['status'] != 'completed':
+        st.error(f"{region_data['Sido']} {region_data['Sigungu']} 지역 분석에 실패했습니다: {result['error']}")
+        return
+
+    # 분석 결과 표시
+    st.markdown(f"""
+    <div style="background-color: #fff; padding: 20px; border-radius: 10px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
+        <h4 style="color: #1f1f1f; margin-bottom: 15px;">AI 분석 결과 - {region_data['Sido']} {region_data['Sigungu']}</h4>
+        {result['analysis']}
+    </div>
+    """, unsafe_allow_html=True)
+
 # DPG API 연동내역 섹션
 st.markdown('<div id="risk-analysis" style="padding-top: 2rem;"></div>', unsafe_allow_html=True)
 api_status_container = st.container()
@@ -543,11 +605,8 @@ with api_status_container:
     st.markdown('<div class="section-header">복지 위험도 분석</div>', unsafe_allow_html=True)
     
     try:
-        # 경로와 인코딩 수정
-        risk_data = pd.read_csv('./data/Find_sigungu_with_sido_sigungu.csv', encoding='euc-kr')
-        
-        # 위험도 기준으로 정렬
-        risk_data = risk_data.sort_values('Result', ascending=False)
+        # 위험도 기준으로 정렬된 데이터
+        risk_data = load_risk_data()
         
         # 상위 5개, 하위 5개 지역 추출
         top_5 = risk_data.head(5)
@@ -570,59 +629,9 @@ with api_status_container:
                 if st.button(f"🔴 {row['Sido']} {row['Sigungu']} - 위험도: {risk_percent:.1f}%", 
                            key=f"top_{row['Sigungu']}",
                            help="클릭하여 상세 분석 보기"):
-                    # 버튼 클릭 시에만 실행되는 코드
+                    # 버튼 클릭 시 분석을 백그라운드에서 시작 (결과는 아래 영역에 표시)
                     region_data = row.to_dict()
-                    
-                    # Thread 생성
-                    thread = client.beta.threads.create()
-                    
-                    # 메시지 작성
-                    message_content = f"""
-                    지역: {region_data['Sido']} {region_data['Sigungu']}
-                    위험도 점수: {region_data['Result']:.3f}
-                    위치: 위도 {region_data['Latitude']}, 경도 {region_data['Longitude']}
-                    
-                    이 지역의 복지 위험도를 분석하고, 구체적인 개선 방안을 제시해주세요.
-                    """
-                    
-                    # 메시지 전송 및 응답 처리
-                    with st.spinner('AI가 분석 중입니다...'):
-                        # Thread 생성
-                        thread = client.beta.threads.create()
-                        
-                        # 메시지 전송
-                        message = client.beta.threads.messages.create(
-                            thread_id=thread.id,
-                            role="user",
-                            content=message_content
-                        )
-                        
-                        # 실행
-                        run = client.beta.threads.runs.create(
-                            thread_id=thread.id,
-                            assistant_id=ASSISTANT_ID
-                        )
-                        
-                        # 결과 대기
-                        while True:
-                            run = client.beta.threads.runs.retrieve(
-                                thread_id=thread.id,
-                                run_id=run.id
-                            )
-                            if run.status == 'completed':
-                                break
-                        
-                        # 응답 받기
-                        messages = client.beta.threads.messages.list(thread_id=thread.id)
-                        analysis = messages.data[0].content[0].text.value
-                        
-                        # 분석 결과 표시
-                        st.markdown(f"""
-                        <div style="background-color: #fff; padding: 20px; border-radius: 10px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-                            <h4 style="color: #1f1f1f; margin-bottom: 15px;">AI 분석 결과</h4>
-                            {analysis}
-                        </div>
-                        """, unsafe_allow_html=True)
+                    st.session_state['region_analysis'] = (region_data, region_analysis.submit(region_data))
         
         with col2:
             st.markdown("""
@@ -638,116 +647,16 @@ with api_status_container:
                 if st.button(f"🟢 {row['Sido']} {row['Sigungu']} - 위험도: {risk_percent:.1f}%", 
                            key=f"bottom_{row['Sigungu']}",
                            help="클릭하여 상세 분석 보기"):
-                    # 버튼 클릭 시에만 실행되는 코드
+                    # 버튼 클릭 시 분석을 백그라운드에서 시작 (결과는 아래 영역에 표시)
                     region_data = row.to_dict()
-                    
-                    # Thread 생성 및 AI 분석 (상위 5개 지역과 동일한 코드)
-                    thread = client.beta.threads.create()
-                    
-                    # 메시지 작성
-                    message_content = f"""
-                    지역: {region_data['Sido']} {region_data['Sigungu']}
-                    위험도 점수: {region_data['Result']:.3f}
-                    위치: 위도 {region_data['Latitude']}, 경도 {region_data['Longitude']}
-                    
-                    이 지역의 복지 위험도를 분��하고, 구체적인 개선 방안을 제시해주세요.
-                    """
-                    
-                    # 메시지 전송 및 응답 처리
-                    with st.spinner('AI가 분석 중입니다...'):
-                        # Thread 생성
-                        thread = client.beta.threads.create()
-                        
-                        # 메시지 전송
-                        message = client.beta.threads.messages.create(
-                            thread_id=thread.id,
-                            role="user",
-                            content=message_content
-                        )
-                        
-                        # 실행
-                        run = client.beta.threads.runs.create(
-                            thread_id=thread.id,
-                            assistant_id=ASSISTANT_ID
-                        )
-                        
-                        # 결과 대기
-                        while True:
-                            run = client.beta.threads.runs.retrieve(
-                                thread_id=thread.id,
-                                run_id=run.id
-                            )
-                            if run.status == 'completed':
-                                break
-                        
-                        # 응답 받기
-                        messages = client.beta.threads.messages.list(thread_id=thread.id)
-                        analysis = messages.data[0].content[0].text.value
-                        
-                        # 분석 결과 표시
-                        st.markdown(f"""
-                        <div style="background-color: #fff; padding: 20px; border-radius: 10px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-                            <h4 style="color: #1f1f1f; margin-bottom: 15px;">AI 분석 결과</h4>
-                            {analysis}
-                        </div>
-                        """, unsafe_allow_html=True)
-        
+                    st.session_state['region_analysis'] = (region_data, region_analysis.submit(region_data))
 
-        # AI 분석 결과 표시 영역
-        if 'selected_region' in st.session_state:
-            region_parts = st.session_state.selected_region.split()
-            
-            if region_data:
-                # Thread 생성
-                thread = client.beta.threads.create()
-                
-                # 메시지 작성
-                message_content = f"""
-                지역: {region_data['sido']} {region_data['sigungu']}
-                위험도 점수: {region_data['risk_score']:.3f}
-                치: 위도 {region_data['latitude']}, 경도 {region_data['longitude']}
-                
-                이 지역의 복지 위험도를 분석하고, 구체적인 개선 방안을 제시해주세요.
-                """
-                
-                # 메시지 전송
-                message = client.beta.threads.messages.create(
-                    thread_id=thread.id,
-                    role="user",
-                    content=message_content
-                )
-                
-                # 실행
-                run = client.beta.threads.runs.create(
-                    thread_id=thread.id,
-                    assistant_id=ASSISTANT_ID  # 고정된 Assistant ID 사용
-                )
-                
-                # 결과 대기 및 표시
-                with st.spinner('AI가 분석 중입니다...'):
-                    while True:
-                        run = client.beta.threads.runs.retrieve(
-                            thread_id=thread.id,
-                            run_id=run.id
-                        )
-                        if run.status == 'completed':
-                            break
-                    
-                    # 응답 받기
-                    messages = client.beta.threads.messages.list(thread_id=thread.id)
-                    analysis = messages.data[0].content[0].text.value
-                    
-                    # 분석 결과 표시
-                    st.markdown(f"""
-                    <div style="background-color: #fff; padding: 20px; border-radius: 10px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
-                        <h4 style="color: #1f1f1f; margin-bottom: 15px;">AI 분석 결과</h4>
-                        {analysis}
-                    </div>
-                    """, unsafe_allow_html=True)
-        
     except Exception as e:
         st.error(f"위험도 데이터를 불러오는 중 오류가 발생했습니다: {str(e)}")
 
+    # AI 분석 결과 표시 영역 (fragment 의 st.rerun() 이 예외 처리에 잡히지 않도록 try 밖에서 호출)
+    show_region_analysis()
+
 # 머신러닝 현황 섹션
 st.markdown('<div id="ml-status" style="padding-top: 2rem;"></div>', unsafe_allow_html=True)
 ml_status_container = st.container()
@@ -760,8 +669,7 @@ with ml_status_container:
     with tab1:
         try:
             # JSON 파일에서 모델 정보 로드
-            with open('/app/data/ml/model_info.json', 'r', encoding='utf-8') as f:
-                model_info = json.load(f)
+            model_info = load_model_info()
             model_info_df = pd.DataFrame(model_info['models'])
             
             # Grid 옵션 설정
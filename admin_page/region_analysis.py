@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Assistants API 실행(run) 상태 중 더 이상 바뀌지 않는 상태
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled', 'expired', 'incomplete', 'requires_action')
+
+# 결과 대기 설정 (초): 처음 간격에서 시작해 BACKOFF_FACTOR 배씩 늘리고 MAX_POLL_INTERVAL 에서 멈춤
+INITIAL_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 8.0
+BACKOFF_FACTOR = 2.0
+DEFAULT_TIMEOUT = 120.0
+
+def build_message(region):
+    """지역 분석 요청 메시지를 만듭니다. region: Sido, Sigungu, Result, Latitude, Longitude"""
+    return f"""
+    지역: {region['Sido']} {region['Sigungu']}
+    위험도 점수: {region['Result']:.3f}
+    위치: 위도 {region['Latitude']}, 경도 {region['Longitude']}
+
+    이 지역의 복지 위험도를 분석하고, 구체적인 개선 방안을 제시해주세요.
+    """
+
+class RegionAnalysisService:
+    """OpenAI Assistant 로 지역 복지 위험도 분석을 요청하고 결과를 캐시합니다.
+
+    실행 상태는 지수적으로 늘어나는 간격으로 조회하고, timeout 안에 끝나지 않으면 실행을
+    취소합니다. 완료된 분석은 (지역, 위험도, Assistant ID) 키로 보관하므로 같은 지역을
+    다시 선택하면 API를 호출하지 않습니다. client 는 openai.OpenAI() 와 같은 형태의 객체면 됩니다.
+    """
+
+    def __init__(self, client, assistant_id, timeout=DEFAULT_TIMEOUT, initial_interval=INITIAL_POLL_INTERVAL,
+                 max_interval=MAX_POLL_INTERVAL, max_workers=2, sleep=time.sleep, clock=time.monotonic):
+        self.client = client
+        self.assistant_id = assistant_id
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self._sleep = sleep
+        self._clock = clock
+        self._cache = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def cache_key(self, region):
+        return (region['Sido'], region['Sigungu'], round(float(region['Result']), 6), self.assistant_id)
+
+    def _wait_for_run(self, thread_id, run):
+        """실행이 끝날 때까지 백오프 간격으로 상태를 조회합니다. 시간 초과면 None."""
+        deadline = self._clock() + self.timeout
+        interval = self.initial_interval
+        while run.status not in TERMINAL_STATUSES:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return None
+            self._sleep(min(interval, remaining))
+            interval = min(interval * BACKOFF_FACTOR, self.max_interval)
+            run = self.client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+        return run
+
+    def _cancel(self, thread_id, run_id):
+        try:
+            self.client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+        except Exception:
+            pass
+
+    def analyze(self, region):
+        """지역 분석 결과를 반환합니다.
+
+        {'status': 'completed' | 'failed' | 'expired' | 'timeout' | 'error' ..., 'analysis', 'error', 'cached'}
+        """
+        key = self.cache_key(region)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        try:
+            thread = self.client.beta.threads.create()
+            self.client.beta.threads.messages.create(
+                thread_id=thread.id,
+                role="user",
+                content=build_message(region)
+            )
+            run = self.client.beta.threads.runs.create(
+                thread_id=thread.id,
+                assistant_id=self.assistant_id
+            )
+
+            finished = self._wait_for_run(thread.id, run)
+            if finished is None:
+                self._cancel(thread.id, run.id)
+                return {'status': 'timeout', 'analysis': None, 'cached': False,
+                        'error': f"{self.timeout:.0f}초 안에 분석이 끝나지 않았습니다."}
+            if finished.status != 'completed':
+                if finished.status == 'requires_action':
+                    self._cancel(thread.id, run.id)
+                last_error = getattr(finished, 'last_error', None)
+                return {'status': finished.status, 'analysis': None, 'cached': False,
+                        'error': getattr(last_error, 'message', None) or f"분석 실행 상태: {finished.status}"}
+
+            # 가장 최근 메시지(Assistant 응답)만 조회
+            messages = self.client.beta.threads.messages.list(thread_id=thread.id, order='desc', limit=1)
+            analysis = messages.data[0].content[0].text.value
+        except Exception as e:
+            return {'status': 'error', 'analysis': None, 'cached': False, 'error': str(e)}
+
+        result = {'status': 'completed', 'analysis': analysis, 'error': None}
+        with self._lock:
+            self._cache[key] = result
+        return dict(result, cached=False)
+
+    def submit(self, region):
+        """분석을 백그라운드에서 실행하고 Future 를 반환합니다.
+
+        캐시된 결과는 완료된 Future 로 바로 반환하고, 같은 지역의 분석이 진행 중이면
+        새로 실행하지 않고 진행 중인 Future 를 반환합니다.
+        """
+        key = self.cache_key(region)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                future = Future()
+                future.set_result(dict(cached, cached=True))
+                return future
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            future = self._executor.submit(self.analyze, region)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._in_flight.pop(key, None)
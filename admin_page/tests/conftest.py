@@ -0,0 +1,5 @@
+import os
+import sys
+
+# admin_page 모듈은 평면 구조(import data_access 등)이므로 상위 디렉토리를 import 경로에 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
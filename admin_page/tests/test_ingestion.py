@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from data_access import DPG_ENCODING
+from ingestion import DPG_API_LIST_KEYS, ingest_upload
+
+EXISTING = "orgId,title,summary\n3450,대기환경,요약\n,제목없음기관,요약\n"
+UPLOAD = "orgId,title,summary\n3450,대기환경,요약\n,제목없음기관,요약\n3451,새 API,요약\n,새 API 2,요약\n"
+
+@pytest.fixture
+def target_path(tmp_path):
+    path = tmp_path / 'DPG_API_list.csv'
+    path.write_text(EXISTING, encoding=DPG_ENCODING)
+    return str(path)
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / 'ingested_uploads.jsonl')
+
+def ingest(data, file_name, target_path, log_path):
+    return ingest_upload(data, file_name, target_path, DPG_API_LIST_KEYS, log_path=log_path)
+
+def read_org_ids(target_path):
+    rows = pd.read_csv(target_path, encoding=DPG_ENCODING, dtype=str, keep_default_na=False)
+    return list(rows['orgId'])
+
+def test_blank_org_id_rows_are_deduplicated(target_path, log_path):
+    # orgId 가 빈 행이 섞여 있어도 기존 행('3450', '')은 중복으로 판단해야 함
+    result = ingest(UPLOAD.encode(DPG_ENCODING), 'upload.csv', target_path, log_path)
+
+    assert (result['appended'], result['skipped']) == (2, 2)
+    assert read_org_ids(target_path) == ['3450', '', '3451', '']
+
+def test_same_upload_is_ingested_once(target_path, log_path):
+    data = UPLOAD.encode(DPG_ENCODING)
+    ingest(data, 'upload.csv', target_path, log_path)
+    with open(target_path, 'rb') as f:
+        before = f.read()
+
+    again = ingest(data, 'upload.csv', target_path, log_path)
+    assert again['already_ingested']
+    with open(target_path, 'rb') as f:
+        assert f.read() == before
+
+def test_float_ids_from_json_match_existing_rows(target_path, log_path):
+    # 같은 행을 숫자로 담은 JSON 업로드도 중복으로 판단해야 함
+    ingest(UPLOAD.encode(DPG_ENCODING), 'upload.csv', target_path, log_path)
+
+    json_upload = '[{"orgId": 3451.0, "title": "새 API", "summary": "요약"}]'
+    result = ingest(json_upload.encode('utf-8'), 'upload.json', target_path, log_path)
+
+    assert result['appended'] == 0
+    assert read_org_ids(target_path) == ['3450', '', '3451', '']
+
+def test_missing_key_column_is_rejected(target_path, log_path):
+    with pytest.raises(ValueError):
+        ingest("title,summary\n새 API,요약\n".encode(DPG_ENCODING), 'upload.csv', target_path, log_path)
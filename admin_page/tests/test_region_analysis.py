@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+
+from region_analysis import DEFAULT_TIMEOUT, RegionAnalysisService
+
+REGION = {'Sido': '서울특별시', 'Sigungu': '종로구', 'Result': 0.8123, 'Latitude': 37.57, 'Longitude': 126.98}
+
+class FakeAssistantClient:
+    """openai.OpenAI() 의 beta.threads 부분만 흉내 내는 로컬 가짜 클라이언트.
+
+    statuses 순서대로 run 상태를 돌려주고 마지막 상태에 머뭅니다. calls 에 호출 기록이 남습니다.
+    """
+
+    def __init__(self, statuses=('queued', 'in_progress', 'completed'), reply="분석 결과"):
+        self.statuses = list(statuses)
+        self.reply = reply
+        self.calls = []
+        self._runs = {}
+        runs = SimpleNamespace(create=self._create_run, retrieve=self._retrieve_run, cancel=self._cancel_run)
+        messages = SimpleNamespace(create=self._create_message, list=self._list_messages)
+        threads = SimpleNamespace(create=self._create_thread, runs=runs, messages=messages)
+        self.beta = SimpleNamespace(threads=threads)
+
+    def _record(self, name):
+        self.calls.append(name)
+        return f"{name}_{len(self.calls)}"
+
+    def _run(self, run_id):
+        index = min(self._runs[run_id], len(self.statuses) - 1)
+        status = self.statuses[index]
+        last_error = SimpleNamespace(message="fake failure") if status == 'failed' else None
+        return SimpleNamespace(id=run_id, status=status, last_error=last_error)
+
+    def _create_thread(self):
+        return SimpleNamespace(id=self._record('threads.create'))
+
+    def _create_message(self, thread_id, role, content):
+        return SimpleNamespace(id=self._record('messages.create'))
+
+    def _create_run(self, thread_id, assistant_id):
+        run_id = self._record('runs.create')
+        self._runs[run_id] = 0
+        return self._run(run_id)
+
+    def _retrieve_run(self, thread_id, run_id):
+        self._record('runs.retrieve')
+        self._runs[run_id] += 1
+        return self._run(run_id)
+
+    def _cancel_run(self, thread_id, run_id):
+        self._record('runs.cancel')
+
+    def _list_messages(self, thread_id, order='desc', limit=20):
+        self._record('messages.list')
+        text = SimpleNamespace(value=self.reply)
+        return SimpleNamespace(data=[SimpleNamespace(content=[SimpleNamespace(text=text)])])
+
+class FakeClock:
+    """sleep 하면 시간이 그만큼 흐르는 가상 시계."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def make_service():
+    def make(client, timeout=DEFAULT_TIMEOUT):
+        clock = FakeClock()
+        return RegionAnalysisService(client, 'asst_fake', timeout=timeout, sleep=clock.sleep, clock=clock), clock
+    return make
+
+def test_completed_run_is_polled_with_backoff_and_cached(make_service):
+    client = FakeAssistantClient(statuses=['queued'] * 5 + ['completed'])
+    service, clock = make_service(client)
+
+    result = service.analyze(REGION)
+    assert result == {'status': 'completed', 'analysis': "분석 결과", 'error': None, 'cached': False}
+    assert client.calls.count('threads.create') == 1
+    assert clock.sleeps == [0.5, 1.0, 2.0, 4.0, 8.0]
+
+    calls_before = len(client.calls)
+    assert service.submit(REGION).result()['cached']
+    assert len(client.calls) == calls_before
+
+def test_timeout_cancels_run(make_service):
+    client = FakeAssistantClient(statuses=['in_progress'])
+    service, clock = make_service(client, timeout=10)
+
+    result = service.analyze(REGION)
+    assert result['status'] == 'timeout'
+    assert client.calls[-1] == 'runs.cancel'
+    assert clock.now == 10
+
+def test_failed_run_is_not_cached(make_service):
+    client = FakeAssistantClient(statuses=['queued', 'failed'])
+    service, _ = make_service(client)
+
+    result = service.analyze(REGION)
+    assert result['status'] == 'failed'
+    assert result['error'] == 'fake failure'
+    assert service.analyze(REGION)['cached'] is False
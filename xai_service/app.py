@@ -1,18 +1,27 @@
 # flask_server.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file, stream_with_context, g, url_for
 from flask_cors import CORS
-import matplotlib.pyplot as plt
-import shap
-import joblib
-import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-import io
 import base64
-import matplotlib
-import matplotlib.font_manager as fm
-import xgboost
+import json
+import logging
+import math
 import os
+import threading
+import time
+from chart_cache import ChartCache
+from singleflight import SingleFlight
+from charts import DEFAULT_RENDER_OPTIONS, resolve_korean_font, render_chart_png, chart_title
+from model_registry import DEFAULT_MODEL_KEY, ModelRegistry, build_model_specs, explanation_payload
+from jobs import JOB_KINDS, JobManager
+from shap_store import default_store_path
+from metrics import (REQUESTS, ERRORS, REQUEST_LATENCY, STAGE_LATENCY, PAYLOAD_SIZE,
+                     render_metrics, render_gauges)
+
+# key=value 형식의 구조화 로그
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'),
+                    format='%(asctime)s %(levelname)s %(name)s %(message)s')
+logger = logging.getLogger('xai_service')
 
 app = Flask(__name__)
 CORS(app, resources={
@@ -25,77 +34,277 @@ CORS(app, resources={
         ],
         "methods": ["POST", "OPTIONS"],
         "allow_headers": ["Content-Type", "Accept"]
+    },
+    r"/analyze/*": {
+        "origins": [
+            "https://localhost", 
+            "http://localhost:5173",
+            "https://133.186.251.200",
+            "http://133.186.251.200"
+        ],
+        "methods": ["GET", "POST", "OPTIONS"],
+        "allow_headers": ["Content-Type", "Accept", "If-None-Match"],
+        "expose_headers": ["ETag", "Content-Length"]
     }
 })
 
 # 모델과 데이터 로드
 csv_file_path = 'data/아파트_학습데이터_월세.csv'
 xgb_model_file_path = 'data/xgboost_model_apt_m.pkl'
+# 컬럼형 저장소(data/shap_results/all_shap_values/)가 있으면 우선 사용
+shap_store_path = os.environ.get('SHAP_STORE_PATH') or default_store_path('data/shap_results')
+model_dir = os.environ.get('XAI_MODEL_DIR', 'data/models')
+# 모델 파일명 목록 (admin_page/data/ml/model_info.json 과 같은 형식)
+model_info_path = os.environ.get('XAI_MODEL_INFO', os.path.join(model_dir, 'model_info.json'))
+max_loaded_models = int(os.environ.get('MAX_LOADED_MODELS', '4'))
+# 차트 캐시 용량 (MB, 항목 수가 아니라 PNG/base64 크기 합계 기준)
+chart_cache_mb = int(os.environ.get('CHART_CACHE_MB', '64'))
+prerendered_chart_dir = os.environ.get('PRERENDERED_CHART_DIR', 'data/charts')
+png_max_age = int(os.environ.get('PNG_MAX_AGE', '600'))
+max_batch_regions = int(os.environ.get('MAX_BATCH_REGIONS', '500'))
+# 'shap' (shap.Explainer) 또는 'native' (XGBoost pred_contribs)
+explainer_backend = os.environ.get('XAI_EXPLAINER_BACKEND', 'shap')
+job_dir = os.environ.get('JOB_DIR', 'data/jobs')
+# 작업 프로세스 수 (gunicorn 워커마다 따로 풀을 만들므로 전체 프로세스 수는 워커 수 x JOB_WORKERS)
+job_workers = int(os.environ.get('JOB_WORKERS', '2'))
+job_result_ttl = int(os.environ.get('JOB_RESULT_TTL', '600'))
+job_timeout = int(os.environ.get('JOB_TIMEOUT', '900'))
+# gunicorn 에서는 fork 이후 워커마다 post_fork 훅에서 워밍업을 시작하므로 0 으로 설정됨
+warmup_on_import = os.environ.get('XAI_WARMUP_ON_IMPORT', '1') == '1'
+
+# 요청별 렌더링 옵션 허용 범위
+# 캐시 키가 무한히 늘어나지 않도록 dpi 는 DPI_STEP, 크기(인치)는 FIGSIZE_STEP 단위로 반올림
+DPI_RANGE = (50, 300)
+DPI_STEP = 25
+FIGSIZE_RANGE = (2.0, 20.0)
+FIGSIZE_STEP = 0.5
+# GET PNG 경로에서 바로 렌더링하는 최대 픽셀 수 (기본값: 기본 차트 10x6 인치 @ 300 dpi)
+# 더 큰 요청은 렌더링 작업(/jobs)으로 넘김
+max_sync_pixels = int(os.environ.get('MAX_SYNC_PIXELS', str(3000 * 1800)))
 
 try:
-    # 데이터 로드 및 전처리
-    df = pd.read_csv(csv_file_path, encoding='cp949')
-    df_cleaned = df.replace([float('inf'), float('-inf')], float('nan')).dropna()
-    
-    # StandardScaler 적용
-    scaler = StandardScaler()
-    scaler.fit(df_cleaned.filter(regex='^[xa]'))
-    
-    # 모델 로드 - 새로운 방식으로 저장된 모델 사용
-    xgb_model = joblib.load(xgb_model_file_path)
-    if hasattr(xgb_model, 'save_model'):
-        temp_model_path = 'temp_model.json'
-        xgb_model.save_model(temp_model_path)
-        xgb_model = xgboost.XGBRegressor()
-        xgb_model.load_model(temp_model_path)
-        os.remove(temp_model_path)
-    
-    explainer_xgb = shap.Explainer(xgb_model)
-    print("모델과 데이터 로드 완료")
+    # 기본 모델은 기존 파일 경로를 그대로 사용
+    model_specs = build_model_specs(model_dir, 'data', model_info_path=model_info_path, overrides={
+        DEFAULT_MODEL_KEY: {
+            'model_file': xgb_model_file_path,
+            'csv_file': csv_file_path,
+            'shap_store': shap_store_path,
+            'chart_dir': prerendered_chart_dir
+        }
+    })
+    model_registry = ModelRegistry(model_specs, max_loaded=max_loaded_models,
+                                   explainer_backend=explainer_backend)
+
+    # 기본 모델은 시작 시 로드하고, 나머지는 처음 요청될 때 로드
+    model_registry.get(DEFAULT_MODEL_KEY)
+    chart_cache = ChartCache(max_bytes=chart_cache_mb * 1024 * 1024)
+    # 같은 지역에 대한 동시 요청은 한 번만 계산하고 결과를 공유
+    request_coalescer = SingleFlight()
+
+    # 무거운 작업(시도 전체 배치, interaction 값, 고해상도 렌더링)은 별도 프로세스 풀에서 실행
+    job_manager = JobManager(job_dir, (model_specs, max_loaded_models, explainer_backend),
+                             max_workers=job_workers, result_ttl=job_result_ttl,
+                             job_timeout=job_timeout)
+    logger.info("모델과 데이터 로드 완료 default_model=%s", DEFAULT_MODEL_KEY)
 except Exception as e:
-    print(f"초기화 중 오류 발생: {str(e)}")
+    logger.exception("초기화 중 오류 발생 error=%s", e)
     raise
 
-# matplotlib 설정
-import matplotlib
-matplotlib.use('Agg')
-
-# 한글 폰트 설정 (시스템에 설치된 한글 폰트 찾기)
-import matplotlib.font_manager as fm
-
-# 사용 가능한 폰트 목록 출력 (디버깅용)
-print("Available fonts:")
-for font in fm.fontManager.ttflist:
-    print(font.name)
-
-# 한글 폰트 설정 시도
-plt.rcParams['axes.unicode_minus'] = False
-for font in fm.fontManager.ttflist:
-    if any(name in font.name.lower() for name in ['nanum', 'malgun', 'gulim']):
-        plt.rcParams['font.family'] = font.name
-        print(f"Using font: {font.name}")
-        break
-
-# 기본 그래프 설정
-plt.rcParams.update({
-    'figure.figsize': [12, 8],
-    'figure.dpi': 100,
-    'axes.grid': True,
-    'grid.linestyle': '--',
-    'grid.alpha': 0.5
-})
+# 워밍업 상태 (/ready 에서 사용)
+warmup_state = {'ready': False, 'error': None, 'seconds': None}
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+
+def warm_up():
+    """한글 폰트 검색, explainer 첫 호출, 차트 1개 렌더링으로 첫 요청의 지연을 없앱니다."""
+    start = time.perf_counter()
+    try:
+        resolve_korean_font()
+        bundle = model_registry.get(DEFAULT_MODEL_KEY)
+        sido, sigungu = next(iter(bundle.region_index))
+        bundle.explainer(bundle.X_scaled[bundle.region_index[(sido, sigungu)][:1]])
 
-# 변수 이름을 한글로 매핑
-feature_name_map = {
-    'x1': '총 주택 수', 'x2': '다세대 주택 수', 'x3': '단독 주택 수', 'x4': '아파트 수',
-    'x5': '연립주택 수', 'x6': '영업용건물내주택 수', 'x7': '주택이외거처 수', 'x8': '면적20이하',
-    'a1': '계약면적', 'a2': '보증금', 'a3': '월세금'
-}
+        options = dict(DEFAULT_RENDER_OPTIONS)
+        render_chart_png(bundle.explain_region(sido, sigungu), chart_title(sido, sigungu),
+                         dpi=options['dpi'], figsize=options['figsize'])
+
+        warmup_state.update(ready=True, seconds=time.perf_counter() - start)
+        logger.info("워밍업 완료 seconds=%.2f", warmup_state['seconds'])
+    except Exception as e:
+        warmup_state['error'] = str(e)
+        logger.exception("워밍업 중 오류 error=%s", e)
+
+def start_warmup():
+    """백그라운드 스레드에서 워밍업을 시작합니다. 이미 완료되었거나 진행 중이면 무시합니다."""
+    global _warmup_thread
+    with _warmup_lock:
+        if warmup_state['ready'] or (_warmup_thread is not None and _warmup_thread.is_alive()):
+            return
+        _warmup_thread = threading.Thread(target=warm_up, name='xai-warmup', daemon=True)
+        _warmup_thread.start()
+
+if warmup_on_import:
+    start_warmup()
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unknown'
+    REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 500:
+        ERRORS.inc(endpoint=endpoint)
+    if 'request_start' in g:
+        REQUEST_LATENCY.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    # 스트리밍 응답은 크기를 알 수 없으므로 제외
+    if not response.is_streamed and response.content_length is not None:
+        PAYLOAD_SIZE.observe(response.content_length, endpoint=endpoint)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 텍스트 형식의 지표를 반환합니다."""
+    cache = chart_cache.stats()
+    coalescing = request_coalescer.stats()
+    models = [item for item in model_registry.status() if item['loaded']]
+
+    lines = render_metrics()
+    lines.extend(render_gauges('xai_chart_cache_hits', '차트 캐시 적중 수', [({}, cache['hits'])]))
+    lines.extend(render_gauges('xai_chart_cache_misses', '차트 캐시 미스 수', [({}, cache['misses'])]))
+    lines.extend(render_gauges('xai_chart_cache_hit_ratio', '차트 캐시 적중률', [({}, cache['hit_rate'])]))
+    lines.extend(render_gauges('xai_chart_cache_size', '차트 캐시 항목 수', [({}, cache['size'])]))
+    lines.extend(render_gauges('xai_chart_cache_bytes', '차트 캐시 크기 (바이트)', [({}, cache['bytes'])]))
+    lines.extend(render_gauges('xai_coalesced_executions', '실제로 실행된 계산 수', [({}, coalescing['executions'])]))
+    lines.extend(render_gauges('xai_coalesced_saved', '동시 요청 합치기로 절약한 계산 수', [({}, coalescing['saved'])]))
+    lines.extend(render_gauges('xai_model_load_seconds', '모델 로드 시간',
+                               [({'model': item['key']}, item['load_seconds']) for item in models]))
+    return app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """워밍업이 끝난 뒤에만 200을 반환합니다. (그 전에는 503)"""
+    if warmup_state['ready']:
+        return jsonify({"status": "ready", "warmup_seconds": warmup_state['seconds']})
+    return jsonify({"status": "warming_up", "error": warmup_state['error']}), 503
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    return jsonify({"default": DEFAULT_MODEL_KEY, "models": model_registry.status()})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(chart_cache.stats())
+
+@app.route('/coalescing/stats', methods=['GET'])
+def coalescing_stats():
+    """동시 요청 합치기 통계 (응답한 워커 프로세스 기준)."""
+    return jsonify(dict(request_coalescer.stats(), pid=os.getpid()))
+
+def resolve_model(model_key):
+    """모델 번들과 에러 응답을 반환합니다. 알 수 없는 키면 400, 파일이 없으면 404 응답."""
+    try:
+        return model_registry.get(model_key), None
+    except KeyError:
+        return None, (jsonify({
+            "success": False,
+            "message": f"알 수 없는 모델입니다: {model_key}"
+        }), 400)
+    except FileNotFoundError as e:
+        return None, (jsonify({"success": False, "message": str(e)}), 404)
+
+def encoded_chart(bundle, target_sido, target_sigungu, cache_key):
+    """base64 인코딩된 기본 옵션 차트를 반환합니다. 데이터가 없으면 None."""
+    image_base64 = chart_cache.get(cache_key)
+    if image_base64 is not None:
+        return image_base64
+
+    def compute():
+        binary_data = bundle.prerendered_charts.read(target_sido, target_sigungu)
+        if binary_data is None:
+            explanation = bundle.explain_region(target_sido, target_sigungu)
+            if explanation is None:
+                return None
+
+            options = dict(DEFAULT_RENDER_OPTIONS)
+            binary_data = render_chart_png(
+                explanation, chart_title(target_sido, target_sigungu),
+                dpi=options['dpi'], figsize=options['figsize'])
+        with STAGE_LATENCY.time(stage='encode'):
+            encoded = base64.b64encode(binary_data).decode('UTF-8')
+        logger.info("차트 인코딩 sido=%s sigungu=%s model=%s png_bytes=%d base64_bytes=%d",
+                    target_sido, target_sigungu, bundle.key, len(binary_data), len(encoded))
+        chart_cache.put(cache_key, encoded)
+        return encoded
+
+    return request_coalescer.do(cache_key, compute)
+
+def rendered_png(bundle, sido, sigungu, render_options, cache_key):
+    """요청한 옵션으로 렌더링한 PNG 바이트를 반환합니다. 데이터가 없으면 None."""
+    png = chart_cache.get(cache_key)
+    if png is not None:
+        return png
+
+    def compute():
+        explanation = bundle.explain_region(sido, sigungu)
+        if explanation is None:
+            return None
+
+        options = dict(render_options)
+        rendered = render_chart_png(explanation, chart_title(sido, sigungu),
+                                    dpi=options['dpi'], figsize=options['figsize'])
+        chart_cache.put(cache_key, rendered)
+        return rendered
+
+    return request_coalescer.do(cache_key, compute)
+
+def _quantize(value, step):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"숫자가 아닌 값입니다: {value}")
+    return round(value / step) * step
+
+def parse_render_options(args):
+    """쿼리 파라미터(dpi, width, height)에서 렌더링 옵션을 만듭니다. 범위를 벗어나면 ValueError.
+
+    dpi 와 크기는 DPI_STEP, FIGSIZE_STEP 단위로 반올림합니다.
+    """
+    defaults = dict(DEFAULT_RENDER_OPTIONS)
+    dpi = int(_quantize(args.get('dpi', defaults['dpi']), DPI_STEP))
+    width = _quantize(args.get('width', defaults['figsize'][0]), FIGSIZE_STEP)
+    height = _quantize(args.get('height', defaults['figsize'][1]), FIGSIZE_STEP)
+
+    if not DPI_RANGE[0] <= dpi <= DPI_RANGE[1]:
+        raise ValueError(f"dpi는 {DPI_RANGE[0]}~{DPI_RANGE[1]} 사이여야 합니다.")
+    if not all(FIGSIZE_RANGE[0] <= size <= FIGSIZE_RANGE[1] for size in (width, height)):
+        raise ValueError(f"width/height는 {FIGSIZE_RANGE[0]}~{FIGSIZE_RANGE[1]} 사이여야 합니다.")
+    return (('dpi', dpi), ('figsize', (width, height)))
+
+def render_pixels(render_options):
+    """렌더링 옵션의 출력 픽셀 수."""
+    options = dict(render_options)
+    width, height = options['figsize']
+    return width * height * options['dpi'] ** 2
+
+def render_job_params(model_key, sido, sigungu, render_options):
+    """렌더링 작업(kind=render) 파라미터를 만듭니다."""
+    options = dict(render_options)
+    return {'model': model_key, 'sido': sido, 'sigungu': sigungu,
+            'dpi': options['dpi'], 'width': options['figsize'][0], 'height': options['figsize'][1]}
+
+def not_modified(etag):
+    """If-None-Match 가 일치하면 304 응답을, 아니면 None을 반환합니다."""
+    if request.if_none_match.contains(etag):
+        response = app.make_response(('', 304))
+        response.set_etag(etag)
+        return response
+    return None
+
 @app.route('/analyze', methods=['POST', 'OPTIONS'])
 def analyze():
     if request.method == 'OPTIONS':
@@ -104,81 +313,273 @@ def analyze():
         data = request.get_json()
         target_sido = data.get('sido')
         target_sigungu = data.get('sigungu')
+        model_key = data.get('model', DEFAULT_MODEL_KEY)
+        # format: 'image' (기본값, base64 PNG) 또는 'json' (SHAP 값만 반환)
+        response_format = data.get('format', 'image')
+        if response_format not in ('image', 'json'):
+            return jsonify({
+                "success": False,
+                "message": f"지원하지 않는 응답 형식입니다: {response_format}"
+            }), 400
+
+        bundle, error_response = resolve_model(model_key)
+        if error_response is not None:
+            return error_response
+
+        if response_format == 'json':
+            explanation = request_coalescer.do(
+                ('json', target_sido, target_sigungu, model_key, bundle.version),
+                lambda: bundle.explain_region(target_sido, target_sigungu))
+            if explanation is None:
+                return jsonify({
+                    "success": False, 
+                    "message": "해당 지역의 데이터를 찾을 수 없습니다."
+                }), 404
 
-        # 데이터 필터링
-        target_sample = df_cleaned[
-            (df_cleaned['sido'] == target_sido) & 
-            (df_cleaned['sigungu'] == target_sigungu)
-        ]
+            return jsonify(explanation_payload(target_sido, target_sigungu, explanation))
 
-        if target_sample.empty:
+        # 조건부 요청(ETag/304)은 GET PNG 경로에서만 지원하고, POST 는 서버 캐시만 사용
+        cache_key = (target_sido, target_sigungu, model_key, bundle.version, DEFAULT_RENDER_OPTIONS)
+        image_base64 = encoded_chart(bundle, target_sido, target_sigungu, cache_key)
+        if image_base64 is None:
             return jsonify({
                 "success": False, 
                 "message": "해당 지역의 데이터를 찾을 수 없습니다."
             }), 404
-
-        # 데이터 전처리
-        target_X = scaler.transform(target_sample.filter(regex='^[xa]'))
-        shap_values_xgb_sample = explainer_xgb(target_X)
-
-        # SHAP 값 설명 객체 생성
-        feature_names_korean = [
-            feature_name_map.get(name, name) 
-            for name in target_sample.filter(regex='^[xa]').columns
-        ]
-        
-        shap_values_xgb_sample = shap.Explanation(
-            values=shap_values_xgb_sample.values,
-            base_values=shap_values_xgb_sample.base_values,
-            data=target_X,
-            feature_names=feature_names_korean
-        )
-
-        # 그래프 생성
-        fig, ax = plt.subplots(figsize=(10, 6))
-        ax.grid(axis='x', linestyle='--', linewidth=0.5, zorder=1)
-        ax.grid(axis='y', linestyle='--', linewidth=0.5, zorder=1)
-        
-        shap_values = shap_values_xgb_sample[0].values
-        feature_names = [feature_name_map.get(name, name) 
-                        for name in target_sample.filter(regex='^[xa]').columns]
-        colors = ['blue' if value > 0 else 'red' for value in shap_values]
-        
-        ax.barh(range(len(feature_names)), shap_values, color=colors, zorder=2)
-        ax.set_yticks(range(len(feature_names)))
-        ax.set_yticklabels(feature_names)  # 한글 이름 사용
-        ax.set_xlabel("가중치")
-        ax.set_title(f"{target_sido} {target_sigungu}의 변수 영향도")
-        
-        plt.tight_layout()
-
-        # 이미지 저장
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=300, bbox_inches='tight', 
-                    facecolor='white', edgecolor='none')
-        plt.close()
-        buf.seek(0)
-        
-        # 인코딩 과정 확인
-        binary_data = buf.read()
-        print(f"Binary data length: {len(binary_data)}")
-        
-        base64_data = base64.b64encode(binary_data)
-        print(f"Base64 data length: {len(base64_data)}")
-        
-        image_base64 = base64_data.decode('UTF-8')
-        print(f"Final string length: {len(image_base64)}")
         
         return jsonify({
             "success": True, 
             "image": image_base64,
             "sido": target_sido,
-            "sigungu": target_sigungu
+            "sigungu": target_sigungu,
+            "model": model_key
         })
 
     except Exception as e:
-        print(f"Error in analyze: {str(e)}")  # 디버깅을 위한 에러 출력 추가
+        logger.exception("analyze 처리 중 오류 error=%s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/analyze/<sido>/<sigungu>.png', methods=['GET'])
+def analyze_png(sido, sigungu):
+    """지역 차트를 base64 인코딩 없이 PNG 바이너리로 반환합니다."""
+    try:
+        try:
+            render_options = parse_render_options(request.args)
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+
+        model_key = request.args.get('model', DEFAULT_MODEL_KEY)
+        bundle, error_response = resolve_model(model_key)
+        if error_response is not None:
+            return error_response
+
+        # 큰 렌더링은 요청 스레드를 오래 점유하고 메모리를 많이 쓰므로 작업으로 실행
+        if render_pixels(render_options) > max_sync_pixels:
+            status, _ = job_manager.submit('render', render_job_params(model_key, sido, sigungu, render_options),
+                                           version=bundle.version)
+            response = jsonify({
+                "success": True,
+                "job_id": status['id'],
+                "status": status['status'],
+                "message": f"{max_sync_pixels} 픽셀보다 큰 차트는 작업으로 렌더링합니다."
+            })
+            response.status_code = 202
+            response.headers['Location'] = url_for('job_result', job_id=status['id'])
+            return response
+
+        cache_key = ('png', sido, sigungu, model_key, bundle.version, render_options)
+        etag = ChartCache.make_etag(cache_key)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        # 기본 옵션이면 사전 렌더링된 파일을 그대로 스트리밍
+        if render_options == DEFAULT_RENDER_OPTIONS:
+            prerendered_path = bundle.prerendered_charts.path(sido, sigungu)
+            if prerendered_path is not None and os.path.exists(prerendered_path):
+                return send_file(os.path.abspath(prerendered_path), mimetype='image/png',
+                                 etag=etag, max_age=png_max_age)
+
+        png = rendered_png(bundle, sido, sigungu, render_options, cache_key)
+        if png is None:
+            return jsonify({
+                "success": False, 
+                "message": "해당 지역의 데이터를 찾을 수 없습니다."
+            }), 404
+
+        response = app.response_class(png, mimetype='image/png')
+        response.content_length = len(png)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = png_max_age
+        return response
+
+    except Exception as e:
+        logger.exception("analyze_png 처리 중 오류 error=%s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
+def parse_regions(items):
+    """요청의 regions 목록을 (sido, sigungu) 목록으로 바꿉니다. 형식이 잘못되면 ValueError."""
+    if not isinstance(items, list):
+        raise ValueError("regions 는 목록이어야 합니다.")
+    regions = []
+    for item in items:
+        if not (isinstance(item, dict) and isinstance(item.get('sido'), str)
+                and isinstance(item.get('sigungu'), str)):
+            raise ValueError('regions 의 각 항목은 {"sido": 문자열, "sigungu": 문자열} 형식이어야 합니다.')
+        regions.append((item['sido'], item['sigungu']))
+    return regions
+
+@app.route('/analyze/batch', methods=['POST', 'OPTIONS'])
+def analyze_batch():
+    """여러 지역(또는 한 시도의 모든 시군구)의 SHAP 값을 한 번에 반환합니다.
+
+    요청 본문: {"regions": [{"sido": ..., "sigungu": ...}, ...]} 또는 {"sido": ...}, 선택적으로 "model"
+    "stream": true 이거나 Accept 가 application/x-ndjson 이면 지역별 NDJSON으로 스트리밍합니다.
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "message": "요청 본문은 JSON 객체여야 합니다."}), 400
+        model_key = data.get('model', DEFAULT_MODEL_KEY)
+        bundle, error_response = resolve_model(model_key)
+        if error_response is not None:
+            return error_response
+
+        if data.get('regions'):
+            try:
+                regions = parse_regions(data['regions'])
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
+        elif data.get('sido'):
+            regions = [key for key in bundle.region_index if key[0] == data['sido']]
+        else:
+            return jsonify({
+                "success": False,
+                "message": "regions 또는 sido 를 지정해야 합니다."
+            }), 400
+
+        if len(regions) > max_batch_regions:
+            return jsonify({
+                "success": False,
+                "message": f"한 번에 요청할 수 있는 지역은 최대 {max_batch_regions}개입니다."
+            }), 400
+
+        explanations = bundle.explain_regions(regions)
+        found = [key for key in regions if key in explanations]
+        missing = [{"sido": sido, "sigungu": sigungu} for sido, sigungu in regions if (sido, sigungu) not in explanations]
+
+        stream = data.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson'
+        if stream:
+            def generate():
+                for sido, sigungu in found:
+                    payload = explanation_payload(sido, sigungu, explanations[(sido, sigungu)])
+                    yield json.dumps(payload, ensure_ascii=False) + '\n'
+                for region in missing:
+                    yield json.dumps({"success": False, **region,
+                                      "message": "해당 지역의 데이터를 찾을 수 없습니다."},
+                                     ensure_ascii=False) + '\n'
+            return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        return jsonify({
+            "success": True,
+            "model": model_key,
+            "results": [explanation_payload(sido, sigungu, explanations[(sido, sigungu)])
+                        for sido, sigungu in found],
+            "missing": missing
+        })
+
+    except Exception as e:
+        logger.exception("analyze_batch 처리 중 오류 error=%s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """무거운 설명 작업을 등록하고 작업 ID를 반환합니다.
+
+    요청 본문: {"kind": "batch" | "interactions" | "render", "model": ..., 작업별 파라미터}
+    - batch: "regions" 또는 "sido"
+    - interactions: "sido", "sigungu"
+    - render: "sido", "sigungu", 선택적으로 "dpi", "width", "height"
+    """
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "message": "요청 본문은 JSON 객체여야 합니다."}), 400
+        kind = data.get('kind')
+        if kind not in JOB_KINDS:
+            return jsonify({
+                "success": False,
+                "message": f"kind 는 {', '.join(JOB_KINDS)} 중 하나여야 합니다."
+            }), 400
+
+        model_key = data.get('model', DEFAULT_MODEL_KEY)
+        if model_key not in model_registry.keys():
+            return jsonify({"success": False, "message": f"알 수 없는 모델입니다: {model_key}"}), 400
+        params = {'model': model_key}
+
+        if kind == 'batch':
+            if data.get('regions'):
+                try:
+                    regions = parse_regions(data['regions'])
+                except ValueError as e:
+                    return jsonify({"success": False, "message": str(e)}), 400
+                params['regions'] = [{'sido': sido, 'sigungu': sigungu} for sido, sigungu in regions]
+            elif data.get('sido'):
+                params['sido'] = data['sido']
+            else:
+                return jsonify({"success": False, "message": "regions 또는 sido 를 지정해야 합니다."}), 400
+        else:
+            if not data.get('sido') or not data.get('sigungu'):
+                return jsonify({"success": False, "message": "sido 와 sigungu 를 지정해야 합니다."}), 400
+            params.update(sido=data['sido'], sigungu=data['sigungu'])
+
+        if kind == 'render':
+            try:
+                render_options = parse_render_options(data)
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
+            params = render_job_params(model_key, data['sido'], data['sigungu'], render_options)
+
+        # 모델이 바뀌면 이전 모델의 결과를 재사용하지 않도록 모델 버전을 작업 ID에 포함
+        status, deduplicated = job_manager.submit(kind, params, version=model_registry.version(model_key))
+        return jsonify({
+            "success": True,
+            "job_id": status['id'],
+            "status": status['status'],
+            "deduplicated": deduplicated
+        }), 202
+
+    except Exception as e:
+        logger.exception("submit_job 처리 중 오류 error=%s", e)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    status = job_manager.get(job_id)
+    if status is None:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    return jsonify({"success": True, **{key: status[key] for key in
+                                        ('id', 'kind', 'status', 'created_at', 'finished_at', 'error')}})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    status = job_manager.get(job_id)
+    if status is None:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    if status['status'] == 'failed':
+        return jsonify({"success": False, "error": status['error']}), 500
+    if status['status'] != 'done':
+        return jsonify({"success": True, "status": status['status']}), 202
+
+    result = job_manager.result(job_id)
+    if result is None:
+        # 상태 조회 직후 TTL이 지나 결과가 삭제된 경우
+        return jsonify({"success": False, "message": "작업 결과가 만료되었습니다."}), 410
+    content_type, data = result
+    return app.response_class(data, mimetype=content_type)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001)
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import shutil
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.preprocessing import StandardScaler
+from chart_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+# 변수 이름을 한글로 매핑
+FEATURE_NAME_MAP = {
+    'x1': '총 주택 수', 'x2': '다세대 주택 수', 'x3': '단독 주택 수', 'x4': '아파트 수',
+    'x5': '연립주택 수', 'x6': '영업용건물내주택 수', 'x7': '주택이외거처 수', 'x8': '면적20이하',
+    'a1': '계약면적', 'a2': '보증금', 'a3': '월세금'
+}
+
+# 캐시 항목 구성 파일 (XGBoost 모델은 네이티브 형식, 그 외 sklearn 모델은 joblib)
+MODEL_FILE = 'model.ubj'
+SKLEARN_MODEL_FILE = 'model.joblib'
+SCALER_FILE = 'scaler.npz'
+DATA_FILE = 'data_cleaned.pkl'
+META_FILE = 'meta.json'
+
+class PreparedArtifacts:
+    """전처리된 데이터, 학습된 StandardScaler, 네이티브 형식으로 변환된 XGBoost 모델."""
+
+    def __init__(self, df_cleaned, feature_columns, scaler, model, version):
+        self.df_cleaned = df_cleaned
+        self.feature_columns = feature_columns
+        self.scaler = scaler
+        self.model = model
+        self.version = version
+
+def _to_native_model(model):
+    """joblib 모델을 임시 파일 없이 메모리에서 XGBRegressor로 다시 불러옵니다. (sklearn 모델은 그대로 반환)"""
+    if not hasattr(model, 'save_model'):
+        return model
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    native_model = xgboost.XGBRegressor()
+    native_model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+    return native_model
+
+def _prepare(csv_file_path, model_file_path, version):
+    """원본 CSV와 모델 파일로부터 산출물을 만듭니다."""
+    # 데이터 로드 및 전처리
+    df = pd.read_csv(csv_file_path, encoding='cp949')
+    df_cleaned = df.replace([float('inf'), float('-inf')], float('nan')).dropna()
+    feature_columns = list(df_cleaned.filter(regex='^[xa]').columns)
+
+    # StandardScaler 적용
+    scaler = StandardScaler()
+    scaler.fit(df_cleaned[feature_columns])
+
+    model = _to_native_model(joblib.load(model_file_path))
+    return PreparedArtifacts(df_cleaned, feature_columns, scaler, model, version)
+
+def _save(artifacts, entry_dir):
+    """산출물을 임시 디렉토리에 쓰고 원자적으로 캐시 위치로 옮깁니다."""
+    temp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    os.makedirs(temp_dir, exist_ok=True)
+
+    if isinstance(artifacts.model, xgboost.XGBModel):
+        artifacts.model.save_model(os.path.join(temp_dir, MODEL_FILE))
+    else:
+        joblib.dump(artifacts.model, os.path.join(temp_dir, SKLEARN_MODEL_FILE))
+    scaler = artifacts.scaler
+    np.savez(os.path.join(temp_dir, SCALER_FILE), mean=scaler.mean_, scale=scaler.scale_,
+             var=scaler.var_, n_samples_seen=np.asarray(scaler.n_samples_seen_))
+    artifacts.df_cleaned.to_pickle(os.path.join(temp_dir, DATA_FILE))
+    with open(os.path.join(temp_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'version': artifacts.version, 'feature_columns': artifacts.feature_columns},
+                  f, ensure_ascii=False)
+
+    try:
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        # 다른 워커가 먼저 같은 항목을 만든 경우
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def _load(entry_dir):
+    """캐시 디렉토리에서 산출물을 읽습니다."""
+    with open(os.path.join(entry_dir, META_FILE), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    feature_columns = meta['feature_columns']
+
+    if os.path.exists(os.path.join(entry_dir, MODEL_FILE)):
+        model = xgboost.XGBRegressor()
+        model.load_model(os.path.join(entry_dir, MODEL_FILE))
+    else:
+        model = joblib.load(os.path.join(entry_dir, SKLEARN_MODEL_FILE))
+
+    # 학습된 파라미터로 StandardScaler 복원 (재학습 없음)
+    params = np.load(os.path.join(entry_dir, SCALER_FILE))
+    scaler = StandardScaler()
+    scaler.mean_ = params['mean']
+    scaler.scale_ = params['scale']
+    scaler.var_ = params['var']
+    scaler.n_samples_seen_ = params['n_samples_seen'].item()
+    scaler.n_features_in_ = len(feature_columns)
+    scaler.feature_names_in_ = np.asarray(feature_columns, dtype=object)
+
+    df_cleaned = pd.read_pickle(os.path.join(entry_dir, DATA_FILE))
+    return PreparedArtifacts(df_cleaned, feature_columns, scaler, model, meta['version'])
+
+def load_prepared_artifacts(csv_file_path, model_file_path, cache_dir=None):
+    """원본 파일 해시를 키로 캐시된 산출물을 불러오고, 없으면 만들어서 저장합니다."""
+    cache_dir = cache_dir or os.environ.get('ARTIFACT_CACHE_DIR', 'data/artifact_cache')
+    version = file_digest(csv_file_path, model_file_path)
+    entry_dir = os.path.join(cache_dir, version)
+
+    if os.path.exists(os.path.join(entry_dir, META_FILE)):
+        try:
+            artifacts = _load(entry_dir)
+            logger.info("준비된 산출물 캐시 사용 path=%s", entry_dir)
+            return artifacts
+        except Exception as e:
+            logger.warning("산출물 캐시를 읽지 못해 다시 만듭니다 path=%s error=%s", entry_dir, e)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+    artifacts = _prepare(csv_file_path, model_file_path, version)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        _save(artifacts, entry_dir)
+        logger.info("산출물 캐시 저장 path=%s", entry_dir)
+    except OSError as e:
+        logger.warning("산출물 캐시를 저장하지 못했습니다 path=%s error=%s", entry_dir, e)
+    return artifacts
@@ -0,0 +1,164 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from charts import chart_title, render_chart_png
+from explainers import make_explainer
+from model_registry import FEATURE_NAME_MAP
+from shap_analyzer import ShapAnalyzer
+
+def _best_time(func, repeat):
+    """func 를 repeat 번 실행해 가장 짧은 실행 시간(초)과 마지막 결과를 반환합니다."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_explainers(repeat=3, atol=1e-4):
+    """전체 데이터에서 shap / native explainer 결과가 같은지 확인하고 속도를 비교합니다."""
+    analyzer = ShapAnalyzer()
+    X = analyzer.scaler.transform(analyzer.df_cleaned.filter(regex='^[xa]').values)
+
+    timings = {}
+    outputs = {}
+    for backend in ('shap', 'native'):
+        explainer = make_explainer(analyzer.xgb_model, backend)
+        timings[backend], outputs[backend] = _best_time(lambda: explainer(X), repeat)
+
+    values_diff = np.max(np.abs(np.asarray(outputs['shap'].values) - np.asarray(outputs['native'].values)))
+    base_diff = np.max(np.abs(np.asarray(outputs['shap'].base_values).reshape(-1) -
+                              np.asarray(outputs['native'].base_values).reshape(-1)))
+
+    print(f"행 수: {len(X)}")
+    for backend, elapsed in timings.items():
+        print(f"{backend:>6}: {elapsed * 1000:.1f} ms ({len(X) / elapsed:.0f} rows/sec)")
+    print(f"속도 비율 (shap / native): {timings['shap'] / timings['native']:.1f}x")
+    print(f"최대 오차: shap values {values_diff:.2e}, base values {base_diff:.2e}")
+
+    if values_diff > atol or base_diff > atol:
+        raise SystemExit(f"shap 과 native 결과가 허용 오차({atol})를 넘습니다.")
+    print("일치 확인 완료")
+
+def bench_render(charts=64, threads=8, dpi=100, seed=0):
+    """같은 차트들을 직렬/스레드 풀에서 렌더링해 결과 바이트가 같은지 확인합니다."""
+    rng = np.random.default_rng(seed)
+    feature_names = list(FEATURE_NAME_MAP.values())
+    tasks = [({
+        'feature_names': feature_names,
+        'shap_values': rng.normal(scale=0.01, size=len(feature_names))
+    }, chart_title('테스트시', f"{i}구")) for i in range(charts)]
+
+    def render(task):
+        explanation, title = task
+        return render_chart_png(explanation, title, dpi=dpi)
+
+    serial_time, serial = _best_time(lambda: [render(task) for task in tasks], 1)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        parallel_time, parallel = _best_time(lambda: list(executor.map(render, tasks)), 1)
+
+    mismatches = sum(a != b for a, b in zip(serial, parallel))
+    print(f"차트 {charts}개, 스레드 {threads}개, dpi {dpi}")
+    print(f"직렬: {serial_time:.2f}초, 병렬: {parallel_time:.2f}초")
+    if mismatches:
+        raise SystemExit(f"병렬 렌더링 결과가 직렬 결과와 다른 차트가 {mismatches}개 있습니다.")
+    print("직렬/병렬 렌더링 결과 일치")
+
+def _wait_until_healthy(base_url, timeout=300):
+    """/health 가 응답할 때까지 기다립니다."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"서버가 {timeout}초 안에 시작되지 않았습니다: {base_url}")
+
+def run_load(base_url, regions, requests=200, concurrency=16):
+    """PNG 엔드포인트에 동시 요청을 보내 처리량(req/s)과 지연 시간을 측정합니다.
+
+    지역과 dpi 를 바꿔가며 요청해 캐시 적중 없이 SHAP 계산과 렌더링 경로를 측정합니다.
+    """
+    urls = []
+    for i in range(requests):
+        sido, sigungu = regions[i % len(regions)]
+        dpi = 72 + i // len(regions)
+        urls.append(f"{base_url}/analyze/{urllib.parse.quote(sido)}/{urllib.parse.quote(sigungu)}.png?dpi={dpi}")
+
+    def fetch(url):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url, timeout=120) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        'throughput': requests / elapsed,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    }
+
+def bench_load(worker_counts, requests=200, concurrency=16, port=5099):
+    """워커 수별로 gunicorn 서버를 띄워 처리량이 코어 수에 따라 어떻게 늘어나는지 측정합니다."""
+    analyzer_regions = ShapAnalyzer().df_cleaned[['sido', 'sigungu']]
+    regions = list(analyzer_regions.itertuples(index=False, name=None))
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"요청 {requests}개, 동시성 {concurrency}, CPU {os.cpu_count()}개")
+    baseline = None
+    for workers in worker_counts:
+        env = dict(os.environ, XAI_WORKERS=str(workers), XAI_BIND=f"127.0.0.1:{port}")
+        server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            _wait_until_healthy(base_url)
+            result = run_load(base_url, regions, requests, concurrency)
+        finally:
+            server.terminate()
+            server.wait()
+
+        baseline = baseline or result['throughput']
+        print(f"워커 {workers:>2}: {result['throughput']:.1f} req/s "
+              f"(x{result['throughput'] / baseline:.2f}), "
+              f"p50 {result['p50_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    parser = argparse.ArgumentParser(description='xai_service 성능 측정')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    explainers_parser = subparsers.add_parser('explainers', help='shap / native explainer 일치 확인 및 속도 비교')
+    explainers_parser.add_argument('--repeat', type=int, default=3)
+    explainers_parser.add_argument('--atol', type=float, default=1e-4)
+
+    render_parser = subparsers.add_parser('render', help='동시 렌더링 결과가 직렬 렌더링과 같은지 확인')
+    render_parser.add_argument('--charts', type=int, default=64)
+    render_parser.add_argument('--threads', type=int, default=8)
+    render_parser.add_argument('--dpi', type=int, default=100)
+
+    load_parser = subparsers.add_parser('load', help='gunicorn 워커 수별 처리량 측정')
+    load_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    load_parser.add_argument('--requests', type=int, default=200)
+    load_parser.add_argument('--concurrency', type=int, default=16)
+    load_parser.add_argument('--port', type=int, default=5099)
+
+    args = parser.parse_args()
+    if args.command == 'explainers':
+        bench_explainers(repeat=args.repeat, atol=args.atol)
+    elif args.command == 'render':
+        bench_render(charts=args.charts, threads=args.threads, dpi=args.dpi)
+    elif args.command == 'load':
+        bench_load(args.workers, requests=args.requests, concurrency=args.concurrency, port=args.port)
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+def file_digest(*paths):
+    """파일 내용의 SHA-256 해시 앞 12자리를 반환합니다. (모델 버전 계산용)
+
+    디렉토리는 안의 파일들을 이름순으로 이어서 해시합니다.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                digest.update(name.encode('utf-8'))
+                with open(os.path.join(path, name), 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+        elif os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+    return digest.hexdigest()[:12]
+
+class ChartCache:
+    """렌더링된 차트를 키별로 보관하는 스레드 안전 LRU 캐시.
+
+    항목 수가 아니라 값의 크기(PNG 바이트 또는 base64 문자열 길이) 합계로 용량을 제한하므로
+    큰 차트가 많이 들어와도 메모리 사용량이 max_bytes 를 넘지 않습니다.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_etag(key):
+        """캐시 키로부터 결정적인 ETag 값을 만듭니다. (키에 모델 버전이 포함되어야 함)"""
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """캐시된 값을 반환합니다. 없으면 None."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """값을 저장하고 용량을 넘으면 가장 오래 사용하지 않은 항목부터 제거합니다.
+
+        용량보다 큰 값은 저장하지 않습니다.
+        """
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._items[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        """캐시 크기와 적중/미스 횟수를 반환합니다."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
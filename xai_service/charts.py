@@ -0,0 +1,88 @@
+import io
+import logging
+import matplotlib.font_manager as fm
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.ticker import ScalarFormatter
+from metrics import STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# pyplot 상태 머신과 전역 rcParams 를 사용하지 않고 Figure 객체마다 스타일을 지정하므로
+# 여러 스레드에서 동시에 렌더링해도 요청 간에 설정이 섞이지 않습니다.
+
+# 기본 차트 렌더링 옵션 (캐시 키와 사전 렌더링 매니페스트에 포함)
+DEFAULT_RENDER_OPTIONS = (('dpi', 300), ('figsize', (10, 6)))
+
+KOREAN_FONT_NAMES = ('nanum', 'malgun', 'gulim')
+
+# 한 번 찾은 한글 폰트 이름 (None 이면 한글 폰트 없음)
+_UNRESOLVED = object()
+_korean_font_name = _UNRESOLVED
+
+class _AsciiMinusFormatter(ScalarFormatter):
+    """한글 폰트에 없는 유니코드 마이너스 대신 '-' 를 사용하는 눈금 포매터."""
+
+    def fix_minus(self, s):
+        return s
+
+def resolve_korean_font(verbose=False):
+    """시스템에 설치된 한글 폰트 이름을 찾습니다. 없으면 None. (처음 한 번만 검색)"""
+    global _korean_font_name
+    if _korean_font_name is not _UNRESOLVED:
+        return _korean_font_name
+
+    # 사용 가능한 폰트 목록 출력 (디버깅용)
+    if verbose:
+        logger.debug("사용 가능한 폰트 fonts=%s", [font.name for font in fm.fontManager.ttflist])
+
+    font_name = None
+    for font in fm.fontManager.ttflist:
+        if any(name in font.name.lower() for name in KOREAN_FONT_NAMES):
+            font_name = font.name
+            logger.info("한글 폰트 사용 font=%s", font_name)
+            break
+    else:
+        logger.warning("한글 폰트를 찾지 못했습니다. 기본 폰트를 사용합니다.")
+
+    _korean_font_name = font_name
+    return font_name
+
+def _font_properties():
+    font_name = resolve_korean_font()
+    return FontProperties(family=font_name) if font_name else FontProperties()
+
+def render_chart_png(explanation, title, dpi=300, figsize=(10, 6)):
+    """SHAP 값 막대 그래프를 PNG 바이트로 렌더링합니다. (스레드 안전)"""
+    font = _font_properties()
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.grid(axis='x', linestyle='--', linewidth=0.5, alpha=0.5, zorder=1)
+    ax.grid(axis='y', linestyle='--', linewidth=0.5, alpha=0.5, zorder=1)
+
+    shap_values = explanation['shap_values']
+    feature_names = explanation['feature_names']
+    colors = ['blue' if value > 0 else 'red' for value in shap_values]
+
+    with STAGE_LATENCY.time(stage='plot'):
+        ax.barh(range(len(feature_names)), shap_values, color=colors, zorder=2)
+        ax.set_yticks(range(len(feature_names)))
+        ax.set_yticklabels(feature_names, fontproperties=font)  # 한글 이름 사용
+        ax.xaxis.set_major_formatter(_AsciiMinusFormatter())
+        ax.set_xlabel("가중치", fontproperties=font)
+        ax.set_title(title, fontproperties=font)
+
+        fig.tight_layout()
+
+    # 이미지 저장
+    buf = io.BytesIO()
+    with STAGE_LATENCY.time(stage='savefig'):
+        fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight',
+                    facecolor='white', edgecolor='none')
+    return buf.getvalue()
+
+def chart_title(sido, sigungu):
+    """지역 차트 제목을 반환합니다."""
+    return f"{sido} {sigungu}의 변수 영향도"
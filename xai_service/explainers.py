@@ -0,0 +1,50 @@
+import numpy as np
+import shap
+import xgboost
+
+# 지원하는 SHAP 계산 방식
+# - shap: shap.Explainer (기존 방식)
+# - native: XGBoost Booster.predict(pred_contribs=True) 를 이용한 멀티스레드 TreeSHAP
+EXPLAINER_BACKENDS = ('shap', 'native')
+
+class NativeTreeExplainer:
+    """XGBoost 내장 TreeSHAP으로 SHAP 값을 계산합니다. shap.Explainer 와 같은 방식으로 호출합니다."""
+
+    def __init__(self, model):
+        self.booster = model.get_booster() if hasattr(model, 'get_booster') else model
+
+    def _dmatrix(self, X):
+        return xgboost.DMatrix(np.asarray(X, dtype=np.float32), feature_names=self.booster.feature_names)
+
+    def __call__(self, X):
+        """마지막 열(bias)을 base value로 분리해 shap.Explanation 을 반환합니다."""
+        contribs = self.booster.predict(self._dmatrix(X), pred_contribs=True)
+        return shap.Explanation(
+            values=contribs[:, :-1],
+            base_values=contribs[:, -1],
+            data=np.asarray(X),
+            feature_names=self.booster.feature_names
+        )
+
+    def shap_interaction_values(self, X):
+        """SHAP interaction 값을 (행, 특성, 특성) 배열로 반환합니다. (bias 행/열 제외)"""
+        interactions = self.booster.predict(self._dmatrix(X), pred_interactions=True)
+        return interactions[:, :-1, :-1]
+
+def make_explainer(model, backend='shap', background=None):
+    """backend 에 맞는 explainer를 생성합니다.
+
+    트리 모델이 아닌 경우(MLP 등)에는 background 데이터를 이용한 모델 비의존 explainer를 사용합니다.
+    """
+    if backend not in EXPLAINER_BACKENDS:
+        raise ValueError(f"지원하지 않는 explainer backend 입니다: {backend} (가능한 값: {', '.join(EXPLAINER_BACKENDS)})")
+
+    is_xgboost = hasattr(model, 'get_booster') or isinstance(model, xgboost.Booster)
+    if is_xgboost and backend == 'native':
+        return NativeTreeExplainer(model)
+    if is_xgboost or hasattr(model, 'estimators_'):
+        return shap.Explainer(model)
+
+    if background is None:
+        raise ValueError("트리 모델이 아닌 경우 background 데이터가 필요합니다.")
+    return shap.Explainer(model.predict, background)
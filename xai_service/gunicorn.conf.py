@@ -0,0 +1,52 @@
+# 운영 환경 gunicorn 설정
+# 실행: gunicorn -c gunicorn.conf.py app:app
+#
+# preload_app 으로 부모 프로세스에서 모델, 스케일러, 전처리 데이터를 한 번만 로드한 뒤
+# fork 하므로 워커들은 같은 메모리를 copy-on-write 로 공유합니다.
+import gc
+import multiprocessing
+import os
+import shutil
+
+# BLAS/OpenMP 스레드 수는 numpy 등이 import 되기 전에 설정해야 하므로 앱 로드 전에 지정
+blas_threads = os.environ.get('XAI_BLAS_THREADS', '1')
+for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(name, blas_threads)
+
+# 워커당 XGBoost 스레드 수 (model_registry 에서 사용)
+os.environ.setdefault('XAI_XGB_THREADS', '1')
+
+# 부모 프로세스의 스레드는 fork 후 워커에 남지 않으므로 워밍업은 워커마다 post_fork 에서 시작
+os.environ.setdefault('XAI_WARMUP_ON_IMPORT', '0')
+
+# 워커마다 따로 쌓이는 지표를 /metrics 에서 합산할 수 있도록 prometheus_client 멀티프로세스
+# 모드를 사용합니다. 지난 실행의 값이 섞이지 않도록 앱 로드 전에 디렉토리를 비웁니다.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/xai_metrics')
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+bind = os.environ.get('XAI_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('XAI_WORKERS', multiprocessing.cpu_count()))
+# 동시 요청 합치기(SingleFlight)는 한 워커 프로세스 안에서만 동작하므로, 같은 요청이 동시에
+# 처리될 수 있도록 스레드 워커(gthread)를 사용합니다. (XAI_THREADS=1 이면 합치기가 일어나지 않음)
+worker_class = 'gthread'
+threads = int(os.environ.get('XAI_THREADS', '4'))
+timeout = int(os.environ.get('XAI_TIMEOUT', '120'))
+preload_app = True
+
+def when_ready(server):
+    # 로드가 끝난 객체를 GC 추적 대상에서 제외해 워커에서 불필요한 페이지 복사를 줄임
+    gc.freeze()
+    server.log.info(f"모델 로드 완료, 워커 {workers}개 x 스레드 {threads}개로 시작합니다.")
+    # 작업(/jobs) 프로세스 풀은 워커마다 따로 만들어지고 각자 모델을 로드함
+    job_workers = int(os.environ.get('JOB_WORKERS', '2'))
+    server.log.info(f"작업 프로세스는 최대 {workers * job_workers}개 (워커 {workers}개 x JOB_WORKERS {job_workers}개) 입니다.")
+
+def post_fork(server, worker):
+    from app import start_warmup
+    start_warmup()
+
+def child_exit(server, worker):
+    # 종료된 워커의 지표 파일 정리 (카운터/히스토그램 누적값은 합계에 계속 포함됨)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
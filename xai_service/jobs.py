@@ -0,0 +1,270 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from charts import chart_title, render_chart_png
+from model_registry import DEFAULT_MODEL_KEY, ModelRegistry, explanation_payload
+
+# 지원하는 작업 종류
+# - batch: 여러 지역(또는 한 시도 전체)의 SHAP 값
+# - interactions: 한 지역의 SHAP interaction 값
+# - render: 요청한 dpi/크기의 지역 차트 PNG
+JOB_KINDS = ('batch', 'interactions', 'render')
+
+# 작업 상태 및 결과는 파일로 저장하므로 gunicorn 워커 중 어느 곳에서도 조회할 수 있습니다.
+STATUS_SUFFIX = '.status.json'
+RESULT_SUFFIX = '.result'
+
+# 작업 프로세스 전용 모델 레지스트리
+_worker_registry = None
+
+# 커널 부팅 ID (재부팅 후 같은 pid/시작 시각이 다시 나와도 구별하기 위해 사용)
+try:
+    with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+        BOOT_ID = f.read().strip()
+except OSError:
+    BOOT_ID = None
+
+def process_token(pid):
+    """프로세스를 구별하는 토큰 (부팅 ID + 프로세스 시작 시각). 알 수 없으면 None.
+
+    pid 가 재사용되어도 시작 시각이 다르므로 재시작 이전 프로세스와 구별됩니다.
+    """
+    if BOOT_ID is None:
+        return None
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 프로세스 이름에 공백이 있을 수 있으므로 마지막 ')' 뒤에서 나눔 (starttime 은 22번째 필드)
+    return f"{BOOT_ID}:{stat.rsplit(')', 1)[1].split()[19]}"
+
+def _init_worker(specs, max_loaded, explainer_backend):
+    global _worker_registry
+    _worker_registry = ModelRegistry(specs, max_loaded=max_loaded, explainer_backend=explainer_backend)
+
+def _run_job(kind, params):
+    """작업 프로세스에서 실행됩니다. (content_type, 결과 바이트) 를 반환합니다."""
+    bundle = _worker_registry.get(params.get('model', DEFAULT_MODEL_KEY))
+
+    if kind == 'batch':
+        if params.get('regions'):
+            regions = [(item['sido'], item['sigungu']) for item in params['regions']]
+        else:
+            regions = [key for key in bundle.region_index if key[0] == params['sido']]
+        explanations = bundle.explain_regions(regions)
+        result = {
+            "model": bundle.key,
+            "results": [explanation_payload(sido, sigungu, explanations[(sido, sigungu)])
+                        for sido, sigungu in regions if (sido, sigungu) in explanations],
+            "missing": [{"sido": sido, "sigungu": sigungu}
+                        for sido, sigungu in regions if (sido, sigungu) not in explanations]
+        }
+        return 'application/json', json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    key = (params['sido'], params['sigungu'])
+    if key not in bundle.region_index:
+        raise LookupError("해당 지역의 데이터를 찾을 수 없습니다.")
+
+    if kind == 'interactions':
+        if not hasattr(bundle.explainer, 'shap_interaction_values'):
+            raise ValueError(f"interaction 값을 지원하지 않는 모델입니다: {bundle.key}")
+        target_X = bundle.X_scaled[bundle.region_index[key][:1]]
+        interactions = np.asarray(bundle.explainer.shap_interaction_values(target_X))[0]
+        result = {
+            "model": bundle.key,
+            "sido": key[0],
+            "sigungu": key[1],
+            "feature_names": bundle.feature_names,
+            "interaction_values": interactions.tolist()
+        }
+        return 'application/json', json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    if kind == 'render':
+        explanation = bundle.explain_region(*key)
+        png = render_chart_png(explanation, chart_title(*key), dpi=params['dpi'],
+                               figsize=(params['width'], params['height']))
+        return 'image/png', png
+
+    raise ValueError(f"지원하지 않는 작업 종류입니다: {kind}")
+
+class JobManager:
+    """무거운 설명 작업을 제한된 프로세스 풀에서 실행하고 상태/결과를 파일로 보관합니다.
+
+    같은 종류, 파라미터, 모델 버전의 작업은 같은 작업 ID를 가지므로, 진행 중이거나 TTL 안에
+    끝난 작업이 있으면 새로 실행하지 않고 기존 작업을 반환합니다.
+
+    작업 상태에는 작업을 맡은 프로세스의 pid 와 토큰을 기록하고, 그 프로세스가 없어진
+    (재시작/배포로 종료된) 대기 중 작업은 조회할 때 실패로 바꿉니다. 프로세스 풀은
+    JobManager 마다 (gunicorn 워커마다) 만들어지므로 전체 작업 프로세스 수는
+    워커 수 x max_workers 입니다.
+    """
+
+    def __init__(self, job_dir, worker_args, max_workers=2, result_ttl=600, job_timeout=900):
+        self.job_dir = job_dir
+        self.worker_args = worker_args
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.job_timeout = job_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        os.makedirs(job_dir, exist_ok=True)
+
+    @staticmethod
+    def job_id(kind, params, version=None):
+        """작업 종류, 파라미터, 모델 버전으로부터 결정적인 작업 ID를 만듭니다."""
+        spec = json.dumps([kind, params, version], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(spec.encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.job_dir, job_id + suffix)
+
+    def _write(self, path, data):
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _write_status(self, status):
+        self._write(self._path(status['id'], STATUS_SUFFIX),
+                    json.dumps(status, ensure_ascii=False).encode('utf-8'))
+
+    def _get_executor(self):
+        # gunicorn preload 이후 각 워커에서 처음 작업을 받을 때 풀을 생성
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=self.worker_args
+                )
+            return self._executor
+
+    def _reset_executor(self, executor):
+        """망가진 풀을 버려서 다음 작업 때 새로 만들도록 합니다. (이미 교체된 풀이면 무시)"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _submit_to_executor(self, kind, params):
+        """(풀, future) 를 반환합니다. 작업 프로세스가 비정상 종료되어 풀이 망가졌으면 새로 만들어 다시 시도합니다."""
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(_run_job, kind, params)
+        except BrokenProcessPool:
+            self._reset_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(_run_job, kind, params)
+
+    @staticmethod
+    def _is_orphaned(status):
+        """대기 중인 작업을 맡은 프로세스가 이미 종료되었는지 확인합니다."""
+        if status['status'] != 'pending' or not status.get('owner_token'):
+            return False
+        return process_token(status['owner_pid']) != status['owner_token']
+
+    def _is_expired(self, status, now):
+        if status['status'] in ('done', 'failed'):
+            return now - status['finished_at'] > self.result_ttl
+        # 작업을 맡은 프로세스가 종료되어 끝나지 않은 작업
+        return now - status['created_at'] > self.job_timeout
+
+    def _remove(self, job_id):
+        for suffix in (STATUS_SUFFIX, RESULT_SUFFIX):
+            try:
+                os.remove(self._path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def purge_expired(self):
+        """TTL이 지난 작업 파일을 삭제합니다."""
+        now = time.time()
+        for name in os.listdir(self.job_dir):
+            if name.endswith(STATUS_SUFFIX):
+                job_id = name[:-len(STATUS_SUFFIX)]
+                status = self.get(job_id)
+                if status is not None and self._is_expired(status, now):
+                    self._remove(job_id)
+
+    def get(self, job_id):
+        """작업 상태를 반환합니다. 없으면 None.
+
+        맡은 프로세스가 종료되어 끝나지 않을 대기 중 작업은 실패로 기록한 뒤 반환합니다.
+        """
+        try:
+            with open(self._path(job_id, STATUS_SUFFIX), 'r', encoding='utf-8') as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if self._is_orphaned(status):
+            status = dict(status, status='failed', finished_at=time.time(),
+                          error="작업을 실행하던 프로세스가 종료되었습니다. 다시 요청해주세요.")
+            self._write_status(status)
+        return status
+
+    def result(self, job_id):
+        """끝난 작업의 (content_type, 결과 바이트) 를 반환합니다. 없으면 None."""
+        status = self.get(job_id)
+        if status is None or status['status'] != 'done':
+            return None
+        try:
+            with open(self._path(job_id, RESULT_SUFFIX), 'rb') as f:
+                return status['content_type'], f.read()
+        except FileNotFoundError:
+            # 상태 조회 직후 만료되어 삭제된 경우
+            return None
+
+    def submit(self, kind, params, version=None):
+        """작업을 등록하고 (상태, 중복 여부) 를 반환합니다. version 은 모델 버전입니다."""
+        job_id = self.job_id(kind, params, version)
+        with self._lock:
+            status = self.get(job_id)
+            # 실패한 작업은 재사용하지 않고 다시 실행
+            if (status is not None and status['status'] != 'failed'
+                    and not self._is_expired(status, time.time())):
+                return status, True
+
+            status = {
+                'id': job_id,
+                'kind': kind,
+                'params': params,
+                'version': version,
+                'status': 'pending',
+                'owner_pid': os.getpid(),
+                'owner_token': process_token(os.getpid()),
+                'created_at': time.time(),
+                'finished_at': None,
+                'content_type': None,
+                'error': None
+            }
+            self._write_status(status)
+
+        try:
+            executor, future = self._submit_to_executor(kind, params)
+        except Exception as e:
+            # 풀에 넣지 못한 작업이 'pending' 으로 남지 않도록 실패로 기록
+            self._write_status(dict(status, status='failed', finished_at=time.time(), error=str(e)))
+            raise
+        future.add_done_callback(lambda f: self._finish(status, executor, f))
+        self.purge_expired()
+        return status, False
+
+    def _finish(self, status, executor, future):
+        status = dict(status, finished_at=time.time())
+        try:
+            content_type, data = future.result()
+            self._write(self._path(status['id'], RESULT_SUFFIX), data)
+            status.update(status='done', content_type=content_type)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._reset_executor(executor)
+            status.update(status='failed', error=str(e))
+        self._write_status(status)
@@ -0,0 +1,73 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import CollectorRegistry, REGISTRY, generate_latest, multiprocess
+from prometheus_client import Counter as _Counter, Histogram as _Histogram
+
+# Prometheus 지표 모음 (prometheus_client 래퍼)
+# PROMETHEUS_MULTIPROC_DIR 가 설정되어 있으면 (gunicorn.conf.py 에서 설정) 모든 워커가 같은
+# 디렉토리에 값을 기록하고, /metrics 는 어느 워커가 응답하든 전체 워커의 합계를 반환합니다.
+# 설정이 없으면 (flask 개발 서버 등) 현재 프로세스의 값만 반환합니다.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{str(value)}"' for name, value in labels)
+    return '{' + pairs + '}'
+
+class Counter:
+    """라벨별로 증가만 하는 카운터."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self._metric = _Counter(name, help_text, labelnames)
+
+    def inc(self, amount=1, **labels):
+        (self._metric.labels(**labels) if labels else self._metric).inc(amount)
+
+class Histogram:
+    """라벨별 누적 버킷 히스토그램."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self._metric = _Histogram(name, help_text, labelnames, buckets=buckets)
+
+    def observe(self, value, **labels):
+        (self._metric.labels(**labels) if labels else self._metric).observe(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록의 실행 시간(초)을 기록합니다."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+def render_metrics():
+    """카운터와 히스토그램을 Prometheus 텍스트 형식으로 렌더링합니다. (멀티프로세스 모드면 전체 워커 합계)"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry).decode('utf-8').splitlines()
+
+def render_gauges(name, help_text, values):
+    """스크랩 시점에 계산한 게이지 값을 렌더링합니다. values: [(labels dict, 값), ...]
+
+    캐시/모델 상태처럼 프로세스 메모리에 있는 값은 응답한 워커의 값뿐이므로 pid 라벨을 붙입니다.
+    """
+    pid = os.getpid()
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in values:
+        lines.append(f"{name}{_label_text(tuple(sorted(dict(labels, pid=pid).items())))} {value}")
+    return lines
+
+REQUESTS = Counter('xai_requests_total', '엔드포인트/상태 코드별 요청 수', ['endpoint', 'status'])
+ERRORS = Counter('xai_request_errors_total', '엔드포인트별 5xx 응답 수', ['endpoint'])
+REQUEST_LATENCY = Histogram('xai_request_duration_seconds', '엔드포인트별 요청 처리 시간', ['endpoint'])
+STAGE_LATENCY = Histogram('xai_stage_duration_seconds',
+                          '처리 단계별 소요 시간 (filter, scale, shap, plot, savefig, encode)', ['stage'])
+PAYLOAD_SIZE = Histogram('xai_response_bytes', '엔드포인트별 응답 크기', ['endpoint'], buckets=SIZE_BUCKETS)
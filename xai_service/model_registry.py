@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import product
+import numpy as np
+from artifacts import FEATURE_NAME_MAP, load_prepared_artifacts
+from chart_cache import file_digest
+from explainers import make_explainer
+from prerender import PrerenderedCharts
+from shap_store import ShapStore, default_store_path, model_fingerprint
+from metrics import STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# 모델 종류 (model_info.json 기준, 스태킹 모형 제외)
+ALGORITHMS = ('xgboost', 'random_forest', 'mlp')
+HOUSING_TYPES = {'apt': '아파트', 'opi': '오피스텔', 'single': '단독다가구'}
+TENURE_TYPES = {'jeonse': '전세', 'monthly': '월세'}
+DEFAULT_MODEL_KEY = 'xgboost_apt_monthly'
+
+# 트리 모델이 아닌 경우 explainer 배경 데이터로 사용하는 행 수
+BACKGROUND_SAMPLES = 100
+
+# 워커당 XGBoost 스레드 수 (지정하지 않으면 XGBoost 기본값)
+XGB_THREADS = os.environ.get('XAI_XGB_THREADS')
+
+def dataset_file_name(housing, tenure):
+    """주택 유형/거래 유형에 맞는 학습 데이터 파일명을 반환합니다."""
+    if housing == 'apt':
+        return f"아파트_학습데이터_{TENURE_TYPES[tenure]}.csv"
+    return f"{HOUSING_TYPES[housing]}_{TENURE_TYPES[tenure]}_학습데이터.csv"
+
+def parse_model_file_name(file_name):
+    """model_info.json 의 파일명에서 (algorithm, housing, tenure) 를 읽습니다. 지원하지 않으면 None.
+
+    파일명은 'random_forest_apt_jeonse.pkl', 'xgboost_model_apt_jeonse.pkl' 처럼 '_model' 이 빠진 경우도 있습니다.
+    """
+    stem, ext = os.path.splitext(file_name)
+    if ext != '.pkl':
+        return None
+    for algorithm in ALGORITHMS:
+        if not stem.startswith(algorithm + '_'):
+            continue
+        rest = stem[len(algorithm) + 1:]
+        if rest.startswith('model_'):
+            rest = rest[len('model_'):]
+        housing, _, tenure = rest.partition('_')
+        if housing in HOUSING_TYPES and tenure in TENURE_TYPES:
+            return algorithm, housing, tenure
+    return None
+
+def load_model_info(model_info_path):
+    """model_info.json 에서 {키: (모델 파일명, 학습 데이터 파일명)} 을 읽습니다. 파일이 없으면 None."""
+    if not model_info_path or not os.path.exists(model_info_path):
+        return None
+    with open(model_info_path, 'r', encoding='utf-8') as f:
+        models = json.load(f)['models']
+    files = {}
+    for model in models:
+        parsed = parse_model_file_name(model['파일명'])
+        if parsed is None:
+            continue
+        algorithm, housing, tenure = parsed
+        files[f"{algorithm}_{housing}_{tenure}"] = (model['파일명'],
+                                                    model.get('학습 데이터') or dataset_file_name(housing, tenure))
+    return files
+
+def build_model_specs(model_dir, data_dir, overrides=None, model_info_path=None):
+    """'{algorithm}_{housing}_{tenure}' 키별 모델/데이터/결과 파일 경로를 만듭니다.
+
+    model_info.json 이 있으면 그 파일명을 사용하고 (그 파일이 없으면 기본 이름), 없으면
+    '{algorithm}_model_{housing}_{tenure}.pkl' 이름으로 찾습니다. 모델이나 학습 데이터 파일이
+    없는 키는 경고로 남깁니다.
+    """
+    model_info = load_model_info(model_info_path)
+    specs = OrderedDict()
+    for algorithm, housing, tenure in product(ALGORITHMS, HOUSING_TYPES, TENURE_TYPES):
+        key = f"{algorithm}_{housing}_{tenure}"
+        default_model_file = f"{algorithm}_model_{housing}_{tenure}.pkl"
+        if model_info is None:
+            model_file, csv_file = default_model_file, dataset_file_name(housing, tenure)
+        elif key in model_info:
+            model_file, csv_file = model_info[key]
+            # model_info.json 의 파일명이 실제 파일과 다르면 기본 이름의 파일을 사용
+            if (not os.path.exists(os.path.join(model_dir, model_file))
+                    and os.path.exists(os.path.join(model_dir, default_model_file))):
+                model_file = default_model_file
+        else:
+            continue
+        specs[key] = {
+            'model_file': os.path.join(model_dir, model_file),
+            'csv_file': os.path.join(data_dir, csv_file),
+            'shap_store': default_store_path(os.path.join(data_dir, 'shap_results', key)),
+            'chart_dir': os.path.join(data_dir, 'charts', key)
+        }
+    for key, paths in (overrides or {}).items():
+        specs.setdefault(key, {}).update(paths)
+
+    missing = [key for key, spec in specs.items()
+               if not (os.path.exists(spec['model_file']) and os.path.exists(spec['csv_file']))]
+    if missing:
+        logger.warning("파일이 없는 모델 models=%s", ','.join(missing))
+    return specs
+
+def spec_version(spec):
+    """모델/학습 데이터/SHAP 저장소 파일 해시로 만든 모델 버전."""
+    return file_digest(spec['model_file'], spec['csv_file'], spec['shap_store'])
+
+def explanation_payload(target_sido, target_sigungu, explanation):
+    """클라이언트에서 직접 그래프를 그릴 수 있도록 SHAP 값을 JSON 응답 형태로 만듭니다."""
+    return {
+        "success": True,
+        "sido": target_sido,
+        "sigungu": target_sigungu,
+        "feature_names": list(explanation['feature_names']),
+        "shap_values": np.asarray(explanation['shap_values']).tolist(),
+        "base_value": float(explanation['base_value']),
+        "data": np.asarray(explanation['data']).tolist()
+    }
+
+class ModelBundle:
+    """한 모델의 데이터, 스케일링된 특성 행렬, 지역 인덱스, explainer, 사전 계산 결과."""
+
+    def __init__(self, key, spec, explainer_backend='shap'):
+        start_time = time.perf_counter()
+        self.key = key
+
+        # 전처리된 데이터, StandardScaler, 모델 로드 (원본 파일 해시 기준 캐시)
+        artifacts = load_prepared_artifacts(spec['csv_file'], spec['model_file'])
+        self.df_cleaned = artifacts.df_cleaned
+        self.feature_columns = artifacts.feature_columns
+        self.scaler = artifacts.scaler
+        self.model = artifacts.model
+        if XGB_THREADS and hasattr(self.model, 'get_booster'):
+            self.model.set_params(n_jobs=int(XGB_THREADS))
+
+        # 요청마다 DataFrame을 스캔/스케일링하지 않도록 스케일링된 특성 행렬과
+        # (sido, sigungu) → 행 위치 인덱스를 미리 만들어 둠
+        self.X_scaled = self.scaler.transform(self.df_cleaned[self.feature_columns])
+        self.region_index = self.df_cleaned.groupby(['sido', 'sigungu'], sort=False).indices
+        self.feature_names = [FEATURE_NAME_MAP.get(name, name) for name in self.feature_columns]
+
+        self.explainer = make_explainer(self.model, explainer_backend,
+                                        background=self.X_scaled[:BACKGROUND_SAMPLES])
+
+        # 사전 계산된 SHAP 결과 (없는 지역만 실시간 계산)
+        # 현재 모델/입력 데이터와 다른 기준으로 계산된 항목은 버리고 실시간으로 계산
+        regions = list(zip(self.df_cleaned['sido'], self.df_cleaned['sigungu']))
+        self.shap_store = ShapStore.load(spec['shap_store']).matching(
+            regions, self.X_scaled, model_fingerprint(spec['model_file'], explainer_backend))
+
+        # 모델/데이터가 바뀌면 캐시 키와 ETag가 달라지도록 버전 해시 계산
+        self.version = spec_version(spec)
+
+        # 사전 렌더링된 차트 (모델 버전이 일치할 때만 사용)
+        self.prerendered_charts = PrerenderedCharts.load(spec['chart_dir'], self.version)
+
+        self.load_seconds = time.perf_counter() - start_time
+        logger.info("모델 로드 완료 model=%s version=%s seconds=%.2f", key, self.version, self.load_seconds)
+
+    def explain_regions(self, regions):
+        """여러 지역의 SHAP 값을 {(sido, sigungu): 결과} 로 반환합니다.
+
+        사전 계산 결과가 없는 지역은 한 번의 explainer 호출로 함께 계산하며,
+        데이터가 없는 지역은 결과에서 빠집니다.
+        """
+        results = {}
+        missing = []
+        with STAGE_LATENCY.time(stage='filter'):
+            for key in regions:
+                entry = self.shap_store.get(*key)
+                if entry is not None:
+                    results[key] = entry
+                elif key in self.region_index and key not in missing:
+                    missing.append(key)
+
+        if missing:
+            with STAGE_LATENCY.time(stage='scale'):
+                positions = np.array([self.region_index[key][0] for key in missing])
+                target_X = self.X_scaled[positions]
+            with STAGE_LATENCY.time(stage='shap'):
+                shap_values = self.explainer(target_X)
+            values = np.asarray(shap_values.values, dtype=float)
+            base_values = np.asarray(shap_values.base_values, dtype=float).reshape(-1)
+
+            for i, key in enumerate(missing):
+                results[key] = {
+                    'feature_names': self.feature_names,
+                    'shap_values': values[i],
+                    'base_value': float(base_values[i]),
+                    'data': np.asarray(target_X[i], dtype=float)
+                }
+        return results
+
+    def explain_region(self, sido, sigungu):
+        """지역의 SHAP 값을 반환합니다. 데이터가 없으면 None."""
+        return self.explain_regions([(sido, sigungu)]).get((sido, sigungu))
+
+class ModelRegistry:
+    """모델 번들을 처음 요청될 때 로드하고, 최대 max_loaded 개까지 LRU 방식으로 보관합니다."""
+
+    def __init__(self, specs, max_loaded=4, explainer_backend='shap'):
+        self._specs = specs
+        self.max_loaded = max_loaded
+        self.explainer_backend = explainer_backend
+        self._pool = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def keys(self):
+        return list(self._specs)
+
+    def version(self, key):
+        """모델 버전을 반환합니다. 로드되지 않은 모델은 파일 해시만 계산합니다. 알 수 없는 키면 KeyError."""
+        with self._lock:
+            bundle = self._pool.get(key)
+        if bundle is not None:
+            return bundle.version
+        return spec_version(self._specs[key])
+
+    def is_available(self, key):
+        """모델과 학습 데이터 파일이 모두 있는지 확인합니다."""
+        spec = self._specs[key]
+        return os.path.exists(spec['model_file']) and os.path.exists(spec['csv_file'])
+
+    def get(self, key):
+        """모델 번들을 반환합니다. 알 수 없는 키면 KeyError, 파일이 없으면 FileNotFoundError."""
+        if key not in self._specs:
+            raise KeyError(key)
+
+        with self._lock:
+            bundle = self._pool.get(key)
+            if bundle is not None:
+                self._pool.move_to_end(key)
+                return bundle
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 같은 모델을 동시에 여러 번 로드하지 않도록 모델별 잠금
+        with load_lock:
+            with self._lock:
+                bundle = self._pool.get(key)
+            if bundle is not None:
+                return bundle
+
+            if not self.is_available(key):
+                raise FileNotFoundError(f"모델 파일이 없습니다: {key}")
+            bundle = ModelBundle(key, self._specs[key], self.explainer_backend)
+
+            with self._lock:
+                self._pool[key] = bundle
+                while len(self._pool) > self.max_loaded:
+                    evicted_key, _ = self._pool.popitem(last=False)
+                    logger.info("모델 메모리 해제 model=%s", evicted_key)
+        return bundle
+
+    def status(self):
+        """모델별 사용 가능 여부와 로드 상태를 반환합니다."""
+        with self._lock:
+            loaded = dict(self._pool)
+        return [{
+            'key': key,
+            'available': self.is_available(key),
+            'loaded': key in loaded,
+            'load_seconds': loaded[key].load_seconds if key in loaded else None
+        } for key in self._specs]
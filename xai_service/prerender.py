@@ -0,0 +1,150 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from chart_cache import file_digest
+from charts import DEFAULT_RENDER_OPTIONS, resolve_korean_font, render_chart_png, chart_title
+from shap_analyzer import ShapAnalyzer
+from shap_store import ShapStore, default_store_path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+class PrerenderedCharts:
+    """prerender 작업이 만든 지역별 PNG 파일을 조회합니다."""
+
+    def __init__(self, output_dir=None, files=None):
+        self.output_dir = output_dir
+        self._files = files or {}
+
+    @classmethod
+    def load(cls, output_dir, model_version, render_options=DEFAULT_RENDER_OPTIONS):
+        """매니페스트를 읽습니다. 모델 버전이나 렌더링 옵션이 다르면 빈 목록을 반환합니다."""
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return cls(output_dir)
+
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if (manifest.get('model_version') != model_version or
+                manifest.get('render_options') != repr(render_options)):
+            logger.warning("사전 렌더링 차트의 버전이 달라 사용하지 않습니다 path=%s manifest_version=%s model_version=%s",
+                           output_dir, manifest.get('model_version'), model_version)
+            return cls(output_dir)
+
+        files = {(item['sido'], item['sigungu']): item['path'] for item in manifest['regions']}
+        logger.info("사전 렌더링 차트 로드 완료 path=%s regions=%d", output_dir, len(files))
+        return cls(output_dir, files)
+
+    def path(self, sido, sigungu):
+        """지역 차트 파일의 경로를 반환합니다. 없으면 None."""
+        relative_path = self._files.get((sido, sigungu))
+        if relative_path is None:
+            return None
+        return os.path.join(self.output_dir, relative_path)
+
+    def read(self, sido, sigungu):
+        """지역 차트의 PNG 바이트를 반환합니다. 없으면 None."""
+        path = self.path(sido, sigungu)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def __len__(self):
+        return len(self._files)
+
+def _init_worker():
+    resolve_korean_font()
+
+def _render_region(task):
+    sido, sigungu, explanation, render_options = task
+    options = dict(render_options)
+    png = render_chart_png(explanation, chart_title(sido, sigungu),
+                           dpi=options['dpi'], figsize=options['figsize'])
+    return sido, sigungu, png
+
+def _write_content_addressed(output_dir, png):
+    """PNG를 내용 해시 경로에 저장하고 상대 경로를 반환합니다. 같은 내용이면 다시 쓰지 않습니다."""
+    content_hash = hashlib.sha256(png).hexdigest()
+    relative_path = os.path.join(content_hash[:2], f"{content_hash}.png")
+    path = os.path.join(output_dir, relative_path)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(png)
+        os.replace(temp_path, path)
+    return relative_path
+
+def collect_explanations(analyzer, store):
+    """저장소의 SHAP 결과를 우선 사용하고, 없는 지역만 ShapAnalyzer로 계산합니다."""
+    explanations = dict(store.items())
+    if len(explanations) < len(analyzer.df_cleaned):
+        for record in analyzer.iter_results():
+            key = (record['sido'], record['sigungu'])
+            if key not in explanations:
+                explanations[key] = ShapStore.entry_from_record(record)
+    return explanations
+
+def prerender_all(output_dir, model_version, explanations, regions=None, workers=None,
+                  render_options=DEFAULT_RENDER_OPTIONS):
+    """지역별 차트를 프로세스 풀에서 렌더링하고 매니페스트를 저장합니다."""
+    os.makedirs(output_dir, exist_ok=True)
+    keys = [key for key in (regions or explanations.keys()) if key in explanations]
+    tasks = [(sido, sigungu, explanations[(sido, sigungu)], render_options) for sido, sigungu in keys]
+
+    start_time = time.perf_counter()
+    manifest_regions = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for sido, sigungu, png in executor.map(_render_region, tasks, chunksize=4):
+            manifest_regions.append({
+                'sido': sido,
+                'sigungu': sigungu,
+                'path': _write_content_addressed(output_dir, png)
+            })
+    elapsed = time.perf_counter() - start_time
+
+    manifest = {
+        'model_version': model_version,
+        'render_options': repr(render_options),
+        'regions': manifest_regions
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_path)
+
+    logger.info("사전 렌더링 완료 path=%s regions=%d seconds=%.2f", output_dir, len(manifest_regions), elapsed)
+    return manifest
+
+def load_regions(csv_path):
+    """지역 목록 CSV(Sido, Sigungu 컬럼)에서 (sido, sigungu) 목록을 읽습니다."""
+    regions = pd.read_csv(csv_path, encoding='euc-kr')
+    return list(zip(regions['Sido'], regions['Sigungu']))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    parser = argparse.ArgumentParser(description='전체 지역 SHAP 차트 사전 렌더링')
+    parser.add_argument('--output-dir', default=os.environ.get('PRERENDERED_CHART_DIR', 'data/charts'))
+    parser.add_argument('--store-path', default=os.environ.get('SHAP_STORE_PATH') or default_store_path('data/shap_results'))
+    parser.add_argument('--regions-csv', help='렌더링할 지역 목록 (예: Find_sigungu_with_sido_sigungu.csv)')
+    parser.add_argument('--workers', type=int, default=None, help='프로세스 수 (기본값: CPU 수)')
+    args = parser.parse_args()
+
+    analyzer = ShapAnalyzer()
+    # 현재 모델/입력 데이터와 맞지 않는 저장 결과는 버리고 다시 계산
+    store = ShapStore.load(args.store_path).matching(*analyzer._scaled_matrix(), analyzer.model_fingerprint)
+    # app.py 와 같은 방식으로 모델 버전 계산
+    model_version = file_digest(analyzer.xgb_model_file_path, analyzer.csv_file_path, args.store_path)
+    regions = load_regions(args.regions_csv) if args.regions_csv else None
+
+    prerender_all(args.output_dir, model_version, collect_explanations(analyzer, store),
+                  regions=regions, workers=args.workers)
@@ -1,59 +1,73 @@
-import pandas as pd
 import numpy as np
-import joblib
-import xgboost
-import shap
+import hashlib
 import json
 import os
-from sklearn.preprocessing import StandardScaler
+import time
+import argparse
+import logging
+from explainers import EXPLAINER_BACKENDS, make_explainer
+from artifacts import FEATURE_NAME_MAP, load_prepared_artifacts
+from shap_store import COLUMNAR_DIR_NAME, NDJSON_HEADER_KEY, ColumnarShapStore, model_fingerprint, write_columnar
+
+# 배치 모드에서 한 번에 explainer에 넘기는 행 수
+DEFAULT_CHUNK_SIZE = 1000
+
+# NDJSON 스트리밍 출력 파일명과 기본 flush 간격 (레코드 수)
+NDJSON_FILE_NAME = 'all_shap_values.ndjson'
+DEFAULT_FLUSH_EVERY = 100
+
+# 증분 계산 매니페스트: 지역별 입력 해시 (스케일링된 특성 행 + 모델 지문)
+MANIFEST_FILE_NAME = 'shap_manifest.json'
 
 class ShapAnalyzer:
-    def __init__(self):
+    def __init__(self, explainer_backend='shap'):
+        self.explainer_backend = explainer_backend
+        
         # 파일 경로 설정
         self.csv_file_path = 'data/아파트_학습데이터_월세.csv'
         self.xgb_model_file_path = 'data/xgboost_model_apt_m.pkl'
         self.output_dir = 'data/shap_results'
         
         # 특성 이름 매핑
-        self.feature_name_map = {
-            'x1': '총 주택 수', 'x2': '다세대 주택 수', 'x3': '단독 주택 수', 'x4': '아파트 수',
-            'x5': '연립주택 수', 'x6': '영업용건물내주택 수', 'x7': '주택이외거처 수', 'x8': '면적20이하',
-            'a1': '계약면적', 'a2': '보증금', 'a3': '월세금'
-        }
+        self.feature_name_map = FEATURE_NAME_MAP
         
         # 초기화
         self._load_data_and_model()
         
     def _load_data_and_model(self):
-        """데이터와 모델을 로드하고 전처리합니다."""
-        # 데이터 로드 및 전처리
-        self.df = pd.read_csv(self.csv_file_path, encoding='cp949')
-        self.df_cleaned = self.df.replace([float('inf'), float('-inf')], float('nan')).dropna()
-        
-        # StandardScaler 적용
-        self.scaler = StandardScaler()
-        self.scaler.fit(self.df_cleaned.filter(regex='^[xa]'))
-        
-        # 모델 로드
-        self.xgb_model = joblib.load(self.xgb_model_file_path)
-        if hasattr(self.xgb_model, 'save_model'):
-            temp_model_path = 'temp_model.json'
-            self.xgb_model.save_model(temp_model_path)
-            self.xgb_model = xgboost.XGBRegressor()
-            self.xgb_model.load_model(temp_model_path)
-            os.remove(temp_model_path)
-        
-        self.explainer = shap.Explainer(self.xgb_model)
+        """데이터와 모델을 로드하고 전처리합니다. (원본 파일 해시 기준으로 캐시된 산출물 사용)"""
+        artifacts = load_prepared_artifacts(self.csv_file_path, self.xgb_model_file_path)
+        self.df_cleaned = artifacts.df_cleaned
+        self.scaler = artifacts.scaler
+        self.xgb_model = artifacts.model
         
-    def analyze_and_save(self):
-        """전체 데이터에 대한 SHAP 값을 분석하고 JSON 파일로 저장합니다."""
-        # 출력 디렉토리 생성
-        os.makedirs(self.output_dir, exist_ok=True)
+        self.explainer = make_explainer(self.xgb_model, self.explainer_backend)
+        # 결과와 함께 기록해서 서비스가 다른 모델로 계산된 결과를 쓰지 않도록 함
+        self.model_fingerprint = model_fingerprint(self.xgb_model_file_path, self.explainer_backend)
         
-        results = []
-        
-        # 전체 데이터에 대해 반복
+    def _feature_names(self):
+        """학습 특성 컬럼명을 한글 이름으로 변환합니다."""
+        return [self.feature_name_map.get(name, name)
+                for name in self.df_cleaned.filter(regex='^[xa]').columns]
+
+    def _make_record(self, sido, sigungu, feature_names, shap_values, base_values, data):
+        """한 지역의 SHAP 결과 레코드를 생성합니다. (모든 값은 단일 행 배열)"""
+        return {
+            'sido': sido,
+            'sigungu': sigungu,
+            '복지위험도 요인': feature_names,
+            '복지위험도 요인 shap values': shap_values.tolist(),
+            'base_values': base_values.tolist(),
+            'data': data.tolist(),
+            'model_fingerprint': self.model_fingerprint
+        }
+
+    def _iter_row_results(self, skip=frozenset()):
+        """행 단위로 SHAP 값을 계산합니다. (기존 방식)"""
+        feature_names = self._feature_names()
         for idx, row in self.df_cleaned.iterrows():
+            if (row['sido'], row['sigungu']) in skip:
+                continue
             print(f"분석 중: {idx+1}/{len(self.df_cleaned)}")
             
             # 데이터 전처리
@@ -62,21 +76,69 @@ class ShapAnalyzer:
             # SHAP 값 계산
             shap_values = self.explainer(X)
             
-            # 특성 이름을 한글로 변환
-            feature_names = [self.feature_name_map.get(name, name) 
-                           for name in self.df_cleaned.filter(regex='^[xa]').columns]
-            
-            # 결과 저장
-            row_result = {
-                'sido': row['sido'],
-                'sigungu': row['sigungu'],
-                '복지위험도 요인': feature_names,
-                '복지위험도 요인 shap values': shap_values.values.tolist(),
-                'base_values': shap_values.base_values.tolist(),
-                'data': X.tolist()
-            }
-            
-            results.append(row_result)
+            yield self._make_record(row['sido'], row['sigungu'], feature_names,
+                                    shap_values.values, shap_values.base_values, X)
+
+    def _scaled_matrix(self):
+        """(지역 목록, 스케일링된 전체 특성 행렬) 을 반환합니다."""
+        X_all = self.scaler.transform(self.df_cleaned.filter(regex='^[xa]').values)
+        regions = list(zip(self.df_cleaned['sido'].tolist(), self.df_cleaned['sigungu'].tolist()))
+        return regions, X_all
+
+    def _iter_batched_arrays(self, chunk_size=DEFAULT_CHUNK_SIZE, skip=frozenset()):
+        """전체 특성 행렬을 한 번에 스케일링하고 chunk_size 단위로 SHAP 값을 계산합니다.
+
+        청크마다 (지역 목록, SHAP 값, base 값, 스케일링된 데이터) 배열을 생성합니다.
+        """
+        regions, X_all = self._scaled_matrix()
+
+        # skip 에 포함된 지역(이미 계산된 지역)은 제외
+        if skip:
+            keep = [i for i, key in enumerate(regions) if key not in skip]
+            X_all = X_all[keep]
+            regions = [regions[i] for i in keep]
+        total = len(X_all)
+
+        for start in range(0, total, chunk_size):
+            end = min(start + chunk_size, total)
+            print(f"분석 중: {end}/{total}")
+
+            X = X_all[start:end]
+            shap_values = self.explainer(X)
+            yield regions[start:end], np.asarray(shap_values.values), np.asarray(shap_values.base_values), X
+
+    def _iter_batched_results(self, chunk_size=DEFAULT_CHUNK_SIZE, skip=frozenset()):
+        """배치 계산 결과를 지역별 레코드로 생성합니다."""
+        feature_names = self._feature_names()
+        for regions, values, base_values, X in self._iter_batched_arrays(chunk_size, skip):
+            # 행 단위 결과와 동일한 형태(단일 행 중첩 리스트)로 저장
+            for i, (sido, sigungu) in enumerate(regions):
+                yield self._make_record(sido, sigungu, feature_names,
+                                        values[i:i+1], base_values[i:i+1], X[i:i+1])
+
+    def iter_results(self, batch=True, chunk_size=DEFAULT_CHUNK_SIZE, skip=frozenset()):
+        """지역별 SHAP 결과 레코드를 순서대로 생성합니다. skip 의 (sido, sigungu) 는 제외합니다."""
+        if batch:
+            return self._iter_batched_results(chunk_size, skip)
+        return self._iter_row_results(skip)
+
+    @staticmethod
+    def _report_rate(count, elapsed):
+        rate = count / elapsed if elapsed > 0 else float('inf')
+        print(f"처리 속도: {count}행 / {elapsed:.2f}초 ({rate:.1f} rows/sec)")
+
+    def analyze_and_save(self, batch=True, chunk_size=DEFAULT_CHUNK_SIZE, report_rate=False):
+        """전체 데이터에 대한 SHAP 값을 분석하고 JSON 파일로 저장합니다.
+
+        batch=True 이면 특성 행렬을 한 번에 스케일링하고 chunk_size 행씩 explainer를
+        호출합니다. report_rate=True 이면 처리 속도(rows/sec)를 출력합니다.
+        """
+        # 출력 디렉토리 생성
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        start_time = time.perf_counter()
+        results = list(self.iter_results(batch, chunk_size))
+        elapsed = time.perf_counter() - start_time
         
         # 전체 결과를 하나의 파일로 저장
         all_results_path = os.path.join(self.output_dir, 'all_shap_values.json')
@@ -84,7 +146,224 @@ class ShapAnalyzer:
             json.dump(results, f, ensure_ascii=False, indent=2)
         
         print(f"분석 완료. 결과가 {self.output_dir}/all_shap_values.json 에 저장되었습니다.")
+        if report_rate:
+            self._report_rate(len(results), elapsed)
+
+    def save_columnar(self, chunk_size=DEFAULT_CHUNK_SIZE, report_rate=False):
+        """전체 SHAP 결과를 컬럼형 저장소(.npy 배열 + 지역 인덱스)로 저장합니다.
+
+        특성 이름과 단일 행 중첩 리스트를 지역마다 반복하지 않으므로 JSON보다 작고,
+        ShapStore.load 로 메모리 매핑해서 필요한 지역만 읽을 수 있습니다.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        start_time = time.perf_counter()
+        regions, values, base_values, data = [], [], [], []
+        for chunk_regions, chunk_values, chunk_base_values, X in self._iter_batched_arrays(chunk_size):
+            regions.extend(chunk_regions)
+            values.append(chunk_values)
+            base_values.append(chunk_base_values.reshape(-1))
+            data.append(X)
+        elapsed = time.perf_counter() - start_time
+
+        columnar_path = os.path.join(self.output_dir, COLUMNAR_DIR_NAME)
+        write_columnar(columnar_path, self._feature_names(), regions,
+                       np.concatenate(values), np.concatenate(base_values), np.concatenate(data),
+                       fingerprint=self.model_fingerprint)
+
+        print(f"분석 완료. 결과가 {columnar_path}/ 에 저장되었습니다.")
+        if report_rate:
+            self._report_rate(len(regions), elapsed)
+
+    @staticmethod
+    def _input_hash(fingerprint, row):
+        """한 지역의 explainer 입력(스케일링된 특성 행)과 모델 지문의 해시."""
+        digest = hashlib.sha256(fingerprint.encode('utf-8'))
+        digest.update(np.ascontiguousarray(row, dtype=np.float64).tobytes())
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def _load_manifest(manifest_path):
+        """지난 계산의 {(sido, sigungu): 입력 해시} 를 읽습니다. 없으면 빈 사전."""
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return {(sido, sigungu): input_hash for sido, sigungu, input_hash in manifest['regions']}
+
+    def update_incremental(self, chunk_size=DEFAULT_CHUNK_SIZE, report_rate=False):
+        """입력이 바뀐 지역만 다시 계산해서 컬럼형 저장소를 갱신합니다.
+
+        지역마다 스케일링된 특성 행과 모델 지문을 해시해 매니페스트에 기록해 두고,
+        해시가 같은 지역은 기존 저장소의 값을 그대로 사용합니다. 바뀐 지역이 없으면
+        파일을 다시 쓰지 않습니다.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        columnar_path = os.path.join(self.output_dir, COLUMNAR_DIR_NAME)
+        manifest_path = os.path.join(self.output_dir, MANIFEST_FILE_NAME)
+
+        regions, X_all = self._scaled_matrix()
+        fingerprint = self.model_fingerprint
+        input_hashes = [self._input_hash(fingerprint, row) for row in X_all]
+
+        previous_hashes = self._load_manifest(manifest_path)
+        store = ColumnarShapStore.load(columnar_path) if os.path.isdir(columnar_path) else None
+        reusable = set()
+        if store is not None:
+            reusable = {key for key, input_hash in zip(regions, input_hashes)
+                        if key in store and previous_hashes.get(key) == input_hash}
+
+        # 바뀐 지역도, 삭제된 지역도 없으면 그대로 종료
+        if store is not None and len(reusable) == len(regions) == len(store):
+            print(f"변경된 지역이 없습니다. ({len(regions)}개 지역 재사용)")
+            return
+
+        start_time = time.perf_counter()
+        computed = {}
+        for chunk_regions, values, base_values, X in self._iter_batched_arrays(chunk_size, skip=reusable):
+            base_values = base_values.reshape(-1)
+            for i, key in enumerate(chunk_regions):
+                computed[key] = (values[i], base_values[i], X[i])
+        elapsed = time.perf_counter() - start_time
+
+        # 데이터 순서대로 새로 계산한 값과 재사용한 값을 합침
+        values, base_values, data = [], [], []
+        for key in regions:
+            if key in computed:
+                shap_values, base_value, row = computed[key]
+            else:
+                entry = store.get(*key)
+                shap_values, base_value, row = entry['shap_values'], entry['base_value'], entry['data']
+            values.append(shap_values)
+            base_values.append(base_value)
+            data.append(row)
+
+        write_columnar(columnar_path, self._feature_names(), regions,
+                       np.stack(values), np.asarray(base_values), np.stack(data), fingerprint=fingerprint)
+
+        # 저장소를 쓴 뒤에 매니페스트를 교체 (중간에 실패하면 다음 실행에서 다시 계산됨)
+        temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model_fingerprint': fingerprint,
+                       'regions': [[sido, sigungu, input_hash]
+                                   for (sido, sigungu), input_hash in zip(regions, input_hashes)]},
+                      f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+
+        print(f"증분 분석 완료. 다시 계산 {len(computed)}개, 재사용 {len(reusable)}개 지역 "
+              f"({columnar_path}/)")
+        if report_rate:
+            self._report_rate(len(computed), elapsed)
+
+    def _input_fingerprint(self):
+        """모델 지문과 전체 지역의 explainer 입력으로 만든 지문. (NDJSON 이어 쓰기 확인용)"""
+        regions, X_all = self._scaled_matrix()
+        fingerprint = self.model_fingerprint
+        digest = hashlib.sha256(fingerprint.encode('utf-8'))
+        for (sido, sigungu), row in zip(regions, X_all):
+            digest.update(f"{sido}\t{sigungu}\t{self._input_hash(fingerprint, row)}\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def _read_partial(partial_path):
+        """중단된 NDJSON 파일의 (지문, 완료된 지역) 을 읽고, 끝까지 쓰이지 않은 마지막 줄은 잘라냅니다.
+
+        첫 줄은 {"header": {"fingerprint": ...}} 헤더이며, 헤더가 없으면 지문은 None 입니다.
+        """
+        fingerprint = None
+        completed = set()
+        valid_bytes = 0
+        with open(partial_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if NDJSON_HEADER_KEY in record:
+                    fingerprint = record[NDJSON_HEADER_KEY].get('fingerprint')
+                else:
+                    completed.add((record['sido'], record['sigungu']))
+                valid_bytes += len(line)
+
+        with open(partial_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+        return fingerprint, completed
+
+    def stream_and_save(self, batch=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                        flush_every=DEFAULT_FLUSH_EVERY, resume=True, report_rate=False):
+        """SHAP 결과를 계산되는 대로 한 줄에 하나씩(NDJSON) 기록합니다.
+
+        결과는 '.partial' 파일에 flush_every 레코드마다 디스크로 flush 하고, 끝나면
+        all_shap_values.ndjson 으로 원자적으로 이름을 바꿉니다. 첫 줄에는 모델과 입력
+        데이터의 지문을 헤더로 기록하며, resume=True 이면 지문이 같은 '.partial' 파일에
+        한해 마지막 완료 지역 다음부터 이어서 계산합니다.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        final_path = os.path.join(self.output_dir, NDJSON_FILE_NAME)
+        partial_path = final_path + '.partial'
+        fingerprint = self._input_fingerprint()
+
+        completed = set()
+        if os.path.exists(partial_path):
+            previous_fingerprint, completed = self._read_partial(partial_path) if resume else (None, set())
+            if resume and previous_fingerprint == fingerprint:
+                print(f"중단된 결과에서 이어서 계산합니다: 완료된 지역 {len(completed)}개")
+            else:
+                if resume:
+                    print("모델 또는 입력 데이터가 바뀌어 중단된 결과를 버리고 처음부터 계산합니다.")
+                completed = set()
+                os.remove(partial_path)
+
+        if not os.path.exists(partial_path):
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({NDJSON_HEADER_KEY: {'fingerprint': fingerprint}}) + '\n')
+
+        start_time = time.perf_counter()
+        count = 0
+        with open(partial_path, 'a', encoding='utf-8') as f:
+            for record in self.iter_results(batch, chunk_size, skip=completed):
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                count += 1
+                if count % flush_every == 0:
+                    f.flush()
+                    os.fsync(f.fileno())
+            f.flush()
+            os.fsync(f.fileno())
+        elapsed = time.perf_counter() - start_time
+
+        os.replace(partial_path, final_path)
+        print(f"분석 완료. 결과가 {final_path} 에 저장되었습니다.")
+        if report_rate:
+            self._report_rate(count, elapsed)
 
 if __name__ == "__main__":
-    analyzer = ShapAnalyzer()
-    analyzer.analyze_and_save()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
+    parser = argparse.ArgumentParser(description='전체 지역 SHAP 값 분석')
+    parser.add_argument('--row-mode', action='store_true', help='행 단위로 계산 (기존 방식)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='배치 모드의 explainer 호출 단위 행 수')
+    parser.add_argument('--report-rate', action='store_true', help='처리 속도(rows/sec) 출력')
+    parser.add_argument('--explainer-backend', choices=EXPLAINER_BACKENDS, default='shap', help='SHAP 계산 방식')
+    parser.add_argument('--output-format', choices=('json', 'ndjson', 'columnar'), default='json',
+                        help='json: 전체 결과를 한 번에 저장, ndjson: 계산되는 대로 한 줄씩 저장, '
+                             'columnar: .npy 배열 + 지역 인덱스로 저장 (메모리 매핑 가능)')
+    parser.add_argument('--flush-every', type=int, default=DEFAULT_FLUSH_EVERY, help='ndjson 출력의 flush 간격 (레코드 수)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='입력(특성 행, 모델)이 바뀐 지역만 다시 계산해서 컬럼형 저장소를 갱신')
+    parser.add_argument('--no-resume', action='store_true', help='중단된 ndjson 결과를 버리고 처음부터 계산')
+    args = parser.parse_args()
+
+    analyzer = ShapAnalyzer(explainer_backend=args.explainer_backend)
+    if args.incremental:
+        analyzer.update_incremental(chunk_size=args.chunk_size, report_rate=args.report_rate)
+    elif args.output_format == 'ndjson':
+        analyzer.stream_and_save(batch=not args.row_mode, chunk_size=args.chunk_size,
+                                 flush_every=args.flush_every, resume=not args.no_resume,
+                                 report_rate=args.report_rate)
+    elif args.output_format == 'columnar':
+        analyzer.save_columnar(chunk_size=args.chunk_size, report_rate=args.report_rate)
+    else:
+        analyzer.analyze_and_save(batch=not args.row_mode, chunk_size=args.chunk_size,
+                                  report_rate=args.report_rate)
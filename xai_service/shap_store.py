@@ -0,0 +1,206 @@
+import copy
+import json
+import logging
+import os
+import shutil
+import numpy as np
+from chart_cache import file_digest
+
+logger = logging.getLogger(__name__)
+
+# 컬럼형 저장 형식: 디렉토리 하나에 지역 순서대로 쌓은 배열과 인덱스를 둡니다.
+#   shap_values.npy (지역 수, 특성 수), base_values.npy (지역 수,), data.npy (지역 수, 특성 수)
+#   index.json {"feature_names": [...], "regions": [[sido, sigungu], ...]}
+# 배열은 np.load(..., mmap_mode='r') 로 메모리 매핑해서 필요한 행만 읽을 수 있습니다.
+COLUMNAR_DIR_NAME = 'all_shap_values'
+COLUMNAR_ARRAYS = ('shap_values', 'base_values', 'data')
+COLUMNAR_INDEX_FILE = 'index.json'
+
+# NDJSON 결과 첫 줄(헤더)의 키: 결과를 만든 모델/입력 데이터 지문
+NDJSON_HEADER_KEY = 'header'
+
+# 저장된 입력 행(data)과 현재 스케일링된 특성 행을 같은 값으로 보는 허용 오차
+DATA_TOLERANCE = 1e-9
+
+def model_fingerprint(model_file, explainer_backend):
+    """모델 파일 해시와 explainer 방식으로 만든 모델 지문. (저장된 결과가 어떤 모델로 계산됐는지 확인)"""
+    return f"{file_digest(model_file)}:{explainer_backend}"
+
+def _first_positions(regions):
+    """{(sido, sigungu): 첫 번째 행 위치} 를 반환합니다."""
+    positions = {}
+    for i, key in enumerate(regions):
+        positions.setdefault(key, i)
+    return positions
+
+def _same_row(stored, current, atol=DATA_TOLERANCE):
+    return stored.shape == current.shape and np.allclose(stored, current, rtol=0, atol=atol)
+
+def default_store_path(results_dir):
+    """결과 디렉토리의 컬럼형 저장소를 우선 사용하고, 없으면 all_shap_values.json 경로를 반환합니다."""
+    columnar_path = os.path.join(results_dir, COLUMNAR_DIR_NAME)
+    if os.path.isdir(columnar_path):
+        return columnar_path
+    return os.path.join(results_dir, 'all_shap_values.json')
+
+def write_columnar(path, feature_names, regions, shap_values, base_values, data, fingerprint=None):
+    """SHAP 결과 배열을 컬럼형 저장소로 씁니다. (임시 디렉토리에 쓴 뒤 교체)
+
+    fingerprint 는 결과를 계산한 모델 지문(model_fingerprint)으로 index.json 에 기록됩니다.
+    """
+    temp_dir = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(temp_dir, exist_ok=True)
+    arrays = {'shap_values': shap_values, 'base_values': base_values, 'data': data}
+    for name in COLUMNAR_ARRAYS:
+        np.save(os.path.join(temp_dir, name + '.npy'), np.ascontiguousarray(arrays[name], dtype=np.float64))
+    with open(os.path.join(temp_dir, COLUMNAR_INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'feature_names': list(feature_names),
+                   'model_fingerprint': fingerprint,
+                   'regions': [[sido, sigungu] for sido, sigungu in regions]}, f, ensure_ascii=False)
+
+    # 디렉토리는 덮어쓸 수 없으므로 기존 저장소를 옆으로 옮긴 뒤 교체
+    old_dir = f"{path}.{os.getpid()}.old"
+    if os.path.exists(path):
+        os.replace(path, old_dir)
+    os.replace(temp_dir, path)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def _log_dropped(total, kept):
+    if kept < total:
+        logger.warning("현재 모델/입력 데이터와 맞지 않는 SHAP 결과를 제외합니다 dropped=%d kept=%d",
+                       total - kept, kept)
+
+class ShapStore:
+    """ShapAnalyzer가 저장한 지역별 SHAP 결과를 (sido, sigungu) 키로 조회합니다."""
+
+    def __init__(self, entries=None):
+        self._entries = entries or {}
+
+    @classmethod
+    def load(cls, path):
+        """all_shap_values.json (또는 .ndjson) 을 읽어 지역별 사전으로 만듭니다. 파일이 없으면 빈 저장소를 반환합니다.
+
+        path 가 디렉토리이면 컬럼형 저장소(ColumnarShapStore)를 메모리 매핑해서 반환합니다.
+        """
+        if not os.path.exists(path):
+            logger.info("SHAP 저장소 파일이 없습니다 path=%s", path)
+            return cls()
+        if os.path.isdir(path):
+            return ColumnarShapStore.load(path)
+
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.ndjson'):
+                # 첫 줄의 헤더(모델/입력 데이터 지문)는 건너뜀
+                records = [record for record in (json.loads(line) for line in f if line.strip())
+                           if NDJSON_HEADER_KEY not in record]
+            else:
+                records = json.load(f)
+
+        entries = {}
+        for record in records:
+            entries[(record['sido'], record['sigungu'])] = cls.entry_from_record(record)
+        logger.info("SHAP 저장소 로드 완료 path=%s regions=%d", path, len(entries))
+        return cls(entries)
+
+    @staticmethod
+    def entry_from_record(record):
+        """ShapAnalyzer 결과 레코드를 조회용 항목으로 변환합니다."""
+        # 저장 형식은 단일 행 중첩 리스트이므로 첫 행만 사용
+        return {
+            'feature_names': record['복지위험도 요인'],
+            'shap_values': np.asarray(record['복지위험도 요인 shap values'][0], dtype=float),
+            'base_value': float(record['base_values'][0]),
+            'data': np.asarray(record['data'][0], dtype=float),
+            'model_fingerprint': record.get('model_fingerprint')
+        }
+
+    def matching(self, regions, X_scaled, fingerprint=None):
+        """현재 모델과 입력 데이터로 계산한 것과 같은 항목만 남긴 저장소를 반환합니다.
+
+        regions 는 X_scaled 행 순서의 (sido, sigungu) 목록입니다. 저장된 입력 행(data)이 현재
+        스케일링된 특성 행과 다르거나, 모델 지문이 기록되어 있는데 fingerprint 와 다르면
+        버립니다. 버린 지역은 요청 시 실시간으로 계산됩니다.
+        """
+        positions = _first_positions(regions)
+        entries = {}
+        for key, entry in self.items():
+            position = positions.get(key)
+            if position is None:
+                continue
+            if fingerprint and entry.get('model_fingerprint') not in (None, fingerprint):
+                continue
+            if _same_row(entry['data'], np.asarray(X_scaled[position], dtype=float)):
+                entries[key] = entry
+        _log_dropped(len(self), len(entries))
+        return ShapStore(entries)
+
+    def get(self, sido, sigungu):
+        """지역의 SHAP 결과를 반환합니다. 없으면 None."""
+        return self._entries.get((sido, sigungu))
+
+    def items(self):
+        """((sido, sigungu), 항목) 쌍을 반환합니다."""
+        return self._entries.items()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+class ColumnarShapStore(ShapStore):
+    """컬럼형 저장소를 메모리 매핑해서 조회합니다. 요청된 지역의 행만 디스크에서 읽습니다."""
+
+    def __init__(self, feature_names, regions, shap_values, base_values, data, model_fingerprint=None):
+        super().__init__()
+        self.feature_names = feature_names
+        self.model_fingerprint = model_fingerprint
+        self._positions = {key: i for i, key in enumerate(regions)}
+        self._shap_values = shap_values
+        self._base_values = base_values
+        self._data = data
+
+    @classmethod
+    def load(cls, path):
+        """컬럼형 저장소 디렉토리를 엽니다. (인덱스만 읽고 배열은 메모리 매핑)"""
+        with open(os.path.join(path, COLUMNAR_INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in COLUMNAR_ARRAYS]
+        regions = [tuple(region) for region in index['regions']]
+        logger.info("SHAP 컬럼형 저장소 로드 완료 path=%s regions=%d", path, len(regions))
+        return cls(index['feature_names'], regions, *arrays, index.get('model_fingerprint'))
+
+    def get(self, sido, sigungu):
+        position = self._positions.get((sido, sigungu))
+        if position is None:
+            return None
+        return {
+            'feature_names': self.feature_names,
+            'shap_values': np.asarray(self._shap_values[position], dtype=float),
+            'base_value': float(self._base_values[position]),
+            'data': np.asarray(self._data[position], dtype=float),
+            'model_fingerprint': self.model_fingerprint
+        }
+
+    def items(self):
+        return [(key, self.get(*key)) for key in self._positions]
+
+    def matching(self, regions, X_scaled, fingerprint=None):
+        if fingerprint and self.model_fingerprint not in (None, fingerprint):
+            _log_dropped(len(self), 0)
+            return ShapStore()
+        current = _first_positions(regions)
+        kept = {key: position for key, position in self._positions.items()
+                if key in current and _same_row(np.asarray(self._data[position], dtype=float),
+                                                np.asarray(X_scaled[current[key]], dtype=float))}
+        _log_dropped(len(self), len(kept))
+        # 배열은 그대로 공유하고 조회할 위치만 줄임
+        store = copy.copy(self)
+        store._positions = kept
+        return store
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __len__(self):
+        return len(self._positions)
@@ -0,0 +1,55 @@
+import threading
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 한 번의 계산으로 합치고 결과를 공유합니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, func):
+        """key 에 대한 계산이 진행 중이면 그 결과를 기다리고, 아니면 func 를 실행합니다."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def stats(self):
+        """실제 계산 횟수와 공유로 절약한 계산 횟수를 반환합니다."""
+        with self._lock:
+            return {
+                'executions': self.executions,
+                'saved': self.shared,
+                'in_flight': len(self._calls)
+            }